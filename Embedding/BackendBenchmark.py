@@ -0,0 +1,122 @@
+"""
+Compare embedding backends (PyTorch, ONNX, int8 ONNX) on the same texts.
+
+Usage:
+    python -m Embedding.BackendBenchmark --texts path/to/chunks.txt --queries 200
+"""
+from typing import Any, Dict, List, Optional, Sequence
+import argparse
+import time
+
+import numpy as np
+
+from Embedding.ModelRegistry import model_registry
+from Enums import EmbeddingBackend
+
+
+SAMPLE_TEXTS = [
+    "ما هي شروط صحة العقد في القانون المدني؟",
+    "يلتزم البائع بتسليم المبيع إلى المشتري بالحالة التي كان عليها وقت البيع.",
+    "تنقضي الدعوى الجنائية بمضي عشر سنين من يوم وقوع الجريمة في مواد الجنايات.",
+    "لا جريمة ولا عقوبة إلا بناء على قانون.",
+    "يجوز للمحكمة أن تأمر بوقف تنفيذ العقوبة إذا رأت من أخلاق المحكوم عليه ما يبعث على الاعتقاد بأنه لن يعود إلى مخالفة القانون.",
+]
+
+
+def _percentile(values: Sequence[float], q: float) -> float:
+    return float(np.percentile(np.asarray(values), q)) if values else 0.0
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+def benchmark_backend(model_name: str, backend: EmbeddingBackend, texts: List[str],
+                      queries: int = 100, batch_size: int = 32) -> Dict[str, Any]:
+    """Load time, single-query latency and batch throughput of one backend"""
+    start = time.perf_counter()
+    model = model_registry.get_model(model_name, device="cpu", backend=backend)
+    load_s = time.perf_counter() - start
+
+    # Warm-up so graph optimisation / lazy init is not counted
+    model.encode(texts[:batch_size], batch_size=batch_size)
+
+    latencies = []
+    for i in range(queries):
+        start = time.perf_counter()
+        model.encode([texts[i % len(texts)]])
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    embeddings = model.encode(texts, batch_size=batch_size, convert_to_numpy=True).astype(np.float32)
+    batch_s = time.perf_counter() - start
+
+    return {
+        "backend": backend.value,
+        "load_s": load_s,
+        "latency_p50_ms": _percentile(latencies, 50),
+        "latency_p99_ms": _percentile(latencies, 99),
+        "throughput_texts_per_s": len(texts) / batch_s if batch_s else 0.0,
+        "embeddings": embeddings,
+    }
+
+
+def benchmark_backends(model_name: str, texts: List[str],
+                       backends: Optional[List[EmbeddingBackend]] = None,
+                       queries: int = 100, batch_size: int = 32) -> List[Dict[str, Any]]:
+    """
+    Run every backend on the same texts and measure cosine drift against PyTorch.
+    """
+    backends = backends or list(EmbeddingBackend)
+    if EmbeddingBackend.TORCH not in backends:
+        backends = [EmbeddingBackend.TORCH] + backends
+
+    results = [benchmark_backend(model_name, backend, texts, queries, batch_size) for backend in backends]
+    reference = _normalize(results[backends.index(EmbeddingBackend.TORCH)]["embeddings"])
+
+    for result in results:
+        cosine = np.sum(_normalize(result.pop("embeddings")) * reference, axis=1)
+        result["cosine_mean"] = float(cosine.mean())
+        result["cosine_min"] = float(cosine.min())
+    return results
+
+
+def format_report(results: List[Dict[str, Any]]) -> str:
+    header = f"{'backend':<10} {'load s':>8} {'p50 ms':>8} {'p99 ms':>8} {'texts/s':>9} {'cos mean':>9} {'cos min':>8}"
+    lines = [header, "-" * len(header)]
+    for r in results:
+        lines.append(
+            f"{r['backend']:<10} {r['load_s']:>8.2f} {r['latency_p50_ms']:>8.2f} {r['latency_p99_ms']:>8.2f} "
+            f"{r['throughput_texts_per_s']:>9.1f} {r['cosine_mean']:>9.5f} {r['cosine_min']:>8.5f}"
+        )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark embedding backends")
+    parser.add_argument("--model", default="mohamed2811/Muffakir_Embedding")
+    parser.add_argument("--texts", help="UTF-8 file with one text per line (defaults to built-in samples)")
+    parser.add_argument("--backends", nargs="+", default=[b.value for b in EmbeddingBackend],
+                        choices=[b.value for b in EmbeddingBackend])
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--quantization", default=model_registry.quantization_config,
+                        help="avx2 | avx512 | avx512_vnni | arm64")
+    args = parser.parse_args()
+
+    model_registry.quantization_config = args.quantization
+    if args.texts:
+        with open(args.texts, encoding="utf-8") as f:
+            corpus = [line.strip() for line in f if line.strip()]
+    else:
+        corpus = SAMPLE_TEXTS * 40
+
+    report = benchmark_backends(
+        args.model,
+        corpus,
+        backends=[EmbeddingBackend(b) for b in args.backends],
+        queries=args.queries,
+        batch_size=args.batch_size,
+    )
+    print(format_report(report))
@@ -0,0 +1,455 @@
+from typing import IO, Any, Dict, List, Optional, Sequence, Tuple
+from collections import OrderedDict
+from contextlib import contextmanager
+import hashlib
+import itertools
+import mmap
+import os
+import re
+import struct
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: the cache directory must not be shared between processes
+    fcntl = None
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """
+    Sharded, append-only binary store for embedding vectors.
+
+    Every shard owns two files:
+      - ``shard_XX.bin``: packed float32 vectors, appended one after another
+      - ``shard_XX.idx``: fixed-size records (md5 digest, byte offset, dim)
+
+    The index of every shard is loaded into memory once, and vectors are read
+    through a memory map of the data file, so a lookup never opens a file.
+
+    Several processes may share a cache directory: every shard access holds an
+    ``flock`` on ``shard_XX.lock`` (exclusive for writes) and first catches up
+    with the shard's index file, reading records appended by other processes
+    and reloading it entirely after another process compacted the shard.
+
+    Entries live under ``cache_dir/<namespace>`` so vectors produced by different
+    models (or revisions / dimensions of a model) never mix. When ``max_bytes``
+    is set, every shard gets an equal share of it; a shard that outgrows its
+    share evicts its own least recently used entries by compacting itself,
+    under its own lock only, so lookups in other shards never wait for it.
+    """
+
+    INDEX_RECORD = struct.Struct("<16sQI")  # md5 digest, offset in .bin, dimension
+    DTYPE = np.float32
+    EVICT_TO = 0.9  # fraction of a shard's budget kept after it evicts
+
+    def __init__(self, cache_dir: str = '.embedding_cache', num_shards: int = 16,
+                 namespace: str = 'default', max_bytes: Optional[int] = None):
+        self.root_dir = cache_dir
+        self.namespace = namespace
+        self.cache_dir = os.path.join(cache_dir, self.safe_namespace(namespace))
+        self.num_shards = num_shards
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        self._locks = [threading.Lock() for _ in range(num_shards)]
+        self._index: List[Dict[bytes, Tuple[int, int]]] = [{} for _ in range(num_shards)]
+        self._last_used: List[Dict[bytes, int]] = [{} for _ in range(num_shards)]
+        self._maps: List[Optional[mmap.mmap]] = [None] * num_shards
+        self._lock_files: List[Optional[IO]] = [None] * num_shards
+        # (inode, bytes read) of every shard's index file, to spot other processes' writes
+        self._seen: List[Optional[Tuple[int, int]]] = [None] * num_shards
+        self._clock = itertools.count()
+
+        self._stats_lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "bytes_written": 0}
+        self._shard_bytes = [0] * num_shards
+
+        for shard in range(num_shards):
+            with self._shard_locked(shard):
+                pass
+
+    @staticmethod
+    def safe_namespace(namespace: str) -> str:
+        """Turn a namespace such as ``org/model@rev-d768`` into a directory name"""
+        return re.sub(r'[^A-Za-z0-9._@-]', '_', namespace)
+
+    # ------------------------------------------------------------------ paths
+    def _data_path(self, shard: int) -> str:
+        return os.path.join(self.cache_dir, f"shard_{shard:02d}.bin")
+
+    def _index_path(self, shard: int) -> str:
+        return os.path.join(self.cache_dir, f"shard_{shard:02d}.idx")
+
+    @staticmethod
+    def key(text: str) -> bytes:
+        """Raw md5 digest used as the cache key for a text"""
+        return hashlib.md5(text.encode('utf-8')).digest()
+
+    def _shard_of(self, digest: bytes) -> int:
+        return digest[0] % self.num_shards
+
+    # ------------------------------------------------------------------ locking
+    @contextmanager
+    def _shard_locked(self, shard: int, exclusive: bool = False):
+        """Thread lock and file lock of a shard, with its index caught up with the files"""
+        with self._locks[shard]:
+            if fcntl is None:
+                self._sync(shard)
+                yield
+                return
+            if self._lock_files[shard] is None:
+                self._lock_files[shard] = open(os.path.join(self.cache_dir, f"shard_{shard:02d}.lock"), 'a')
+            lock_file = self._lock_files[shard]
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                self._sync(shard)
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _sync(self, shard: int) -> None:
+        """Pick up records appended by other processes, or reload after they compacted the shard"""
+        try:
+            stat = os.stat(self._index_path(shard))
+        except FileNotFoundError:
+            stat = None
+        seen = self._seen[shard]
+        if stat is None:
+            if seen is not None:
+                self._reset(shard)
+            return
+        if seen is None or stat.st_ino != seen[0] or stat.st_size < seen[1]:
+            self._reset(shard)
+            self._load_index(shard)
+        elif stat.st_size >= seen[1] + self.INDEX_RECORD.size:
+            self._load_index(shard, start=seen[1])
+
+    def _reset(self, shard: int) -> None:
+        self._index[shard], self._last_used[shard] = {}, {}
+        self._shard_bytes[shard] = 0
+        self._seen[shard] = None
+        if self._maps[shard] is not None:
+            self._maps[shard].close()
+            self._maps[shard] = None
+
+    # ------------------------------------------------------------------ index
+    def _load_index(self, shard: int, start: int = 0) -> None:
+        """Read a shard's index records from byte ``start`` on, ignoring a torn trailing record"""
+        path = self._index_path(shard)
+        if not os.path.exists(path):
+            return
+
+        with open(path, 'rb') as f:
+            inode = os.fstat(f.fileno()).st_ino
+            f.seek(start)
+            raw = f.read()
+
+        record_size = self.INDEX_RECORD.size
+        usable = len(raw) - len(raw) % record_size
+        data_size = os.path.getsize(self._data_path(shard)) if os.path.exists(self._data_path(shard)) else 0
+        self._seen[shard] = (inode, start + usable)
+
+        index = self._index[shard]
+        last_used = self._last_used[shard]
+        for digest, offset, dim in self.INDEX_RECORD.iter_unpack(raw[:usable]):
+            # Skip entries whose vector never made it to the data file
+            if offset + dim * self.DTYPE().itemsize <= data_size and digest not in index:
+                index[digest] = (offset, dim)
+                # Compaction writes entries oldest-first, so file order approximates recency
+                last_used[digest] = next(self._clock)
+                self._shard_bytes[shard] += dim * self.DTYPE().itemsize
+
+    def _mapped(self, shard: int, end: int) -> Optional[mmap.mmap]:
+        """Return a read-only map of the shard data covering at least ``end`` bytes"""
+        current = self._maps[shard]
+        if current is not None and len(current) >= end:
+            return current
+
+        path = self._data_path(shard)
+        if not os.path.exists(path) or os.path.getsize(path) < end:
+            return None
+
+        with open(path, 'rb') as f:
+            self._maps[shard] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._maps[shard]
+
+    # ------------------------------------------------------------------ API
+    def __len__(self) -> int:
+        return sum(len(index) for index in self._index)
+
+    @property
+    def shard_budget(self) -> Optional[int]:
+        return self.max_bytes // self.num_shards if self.max_bytes is not None else None
+
+    def __contains__(self, text: str) -> bool:
+        digest = self.key(text)
+        return digest in self._index[self._shard_of(digest)]
+
+    def get_many(self, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """
+        Look up a batch of texts in one pass.
+
+        Returns a list aligned with ``texts`` holding a float32 vector for every
+        hit and ``None`` for every miss.
+        """
+        results: List[Optional[np.ndarray]] = [None] * len(texts)
+        itemsize = self.DTYPE().itemsize
+
+        by_shard: Dict[int, List[Tuple[int, bytes]]] = {}
+        for i, text in enumerate(texts):
+            digest = self.key(text)
+            by_shard.setdefault(self._shard_of(digest), []).append((i, digest))
+
+        for shard, entries in by_shard.items():
+            with self._shard_locked(shard):
+                index = self._index[shard]
+                hits = [(i, d, index[d]) for i, d in entries if d in index]
+                if not hits:
+                    continue
+
+                end = max(offset + dim * itemsize for _, _, (offset, dim) in hits)
+                mapped = self._mapped(shard, end)
+                if mapped is None:
+                    continue
+
+                last_used = self._last_used[shard]
+                for i, digest, (offset, dim) in hits:
+                    results[i] = np.frombuffer(mapped, dtype=self.DTYPE, count=dim, offset=offset).copy()
+                    last_used[digest] = next(self._clock)
+
+        hits = sum(1 for vector in results if vector is not None)
+        with self._stats_lock:
+            self._stats["hits"] += hits
+            self._stats["misses"] += len(texts) - hits
+
+        return results
+
+    def put_many(self, texts: Sequence[str], vectors: Sequence[Sequence[float]]) -> None:
+        """Append vectors for texts that are not cached yet"""
+        by_shard: Dict[int, List[Tuple[bytes, np.ndarray]]] = {}
+        for text, vector in zip(texts, vectors):
+            digest = self.key(text)
+            by_shard.setdefault(self._shard_of(digest), []).append(
+                (digest, np.ascontiguousarray(vector, dtype=self.DTYPE))
+            )
+
+        written = 0
+        evicted = 0
+        for shard, entries in by_shard.items():
+            with self._shard_locked(shard, exclusive=True):
+                index = self._index[shard]
+                last_used = self._last_used[shard]
+                data_path = self._data_path(shard)
+                offset = os.path.getsize(data_path) if os.path.exists(data_path) else 0
+                if not any(digest not in index for digest, _ in entries):
+                    continue
+
+                records = []
+                shard_written = 0
+                with open(data_path, 'ab') as data_file:
+                    for digest, vector in entries:
+                        if digest in index:
+                            continue
+                        data_file.write(vector.tobytes())
+                        records.append((digest, offset, vector.shape[0]))
+                        index[digest] = (offset, vector.shape[0])
+                        last_used[digest] = next(self._clock)
+                        offset += vector.nbytes
+                        shard_written += vector.nbytes
+
+                if not records:
+                    continue
+
+                # The index is written after the data so a crash never points past the end
+                index_path = self._index_path(shard)
+                seen = self._seen[shard]
+                if seen is not None and os.path.getsize(index_path) != seen[1]:
+                    os.truncate(index_path, seen[1])  # drop a torn record so appends stay aligned
+                with open(index_path, 'ab') as index_file:
+                    index_file.write(b"".join(self.INDEX_RECORD.pack(*r) for r in records))
+                    self._seen[shard] = (os.fstat(index_file.fileno()).st_ino, index_file.tell())
+                self._shard_bytes[shard] += shard_written
+                written += shard_written
+
+                if self.max_bytes is not None and self._shard_bytes[shard] > self.shard_budget:
+                    evicted += self._evict_shard(shard, int(self.shard_budget * self.EVICT_TO))
+
+        with self._stats_lock:
+            self._stats["bytes_written"] += written
+            self._stats["evictions"] += evicted
+
+    # ------------------------------------------------------------------ eviction
+    def evict(self, target_bytes: int) -> int:
+        """
+        Drop least recently used entries until the cache holds at most
+        ``target_bytes`` of vectors, split evenly over the shards, which are
+        compacted one at a time. Returns the number of evicted entries.
+        """
+        evicted = 0
+        for shard in range(self.num_shards):
+            with self._shard_locked(shard, exclusive=True):
+                evicted += self._evict_shard(shard, target_bytes // self.num_shards)
+        with self._stats_lock:
+            self._stats["evictions"] += evicted
+        return evicted
+
+    def _evict_shard(self, shard: int, target_bytes: int) -> int:
+        """Drop a shard's least recently used entries down to ``target_bytes`` (caller holds the lock)"""
+        if self._shard_bytes[shard] <= target_bytes:
+            return 0
+        itemsize = self.DTYPE().itemsize
+        index, last_used = self._index[shard], self._last_used[shard]
+
+        total = self._shard_bytes[shard]
+        victims = set()
+        for digest in sorted(index, key=last_used.__getitem__):
+            if total <= target_bytes:
+                break
+            victims.add(digest)
+            total -= index[digest][1] * itemsize
+
+        self._compact(shard, victims)
+        self._shard_bytes[shard] = total
+        return len(victims)
+
+    def _compact(self, shard: int, drop: set) -> None:
+        """Rewrite a shard without ``drop``, oldest entries first (caller holds the lock)"""
+        index = self._index[shard]
+        last_used = self._last_used[shard]
+        itemsize = self.DTYPE().itemsize
+
+        survivors = sorted((d for d in index if d not in drop), key=last_used.__getitem__)
+        end = max((index[d][0] + index[d][1] * itemsize for d in survivors), default=0)
+        mapped = self._mapped(shard, end) if survivors else None
+
+        data_tmp = self._data_path(shard) + ".tmp"
+        index_tmp = self._index_path(shard) + ".tmp"
+        new_index: Dict[bytes, Tuple[int, int]] = {}
+        offset = 0
+        with open(data_tmp, 'wb') as data_file, open(index_tmp, 'wb') as index_file:
+            for digest in survivors:
+                old_offset, dim = index[digest]
+                size = dim * itemsize
+                data_file.write(mapped[old_offset:old_offset + size])
+                index_file.write(self.INDEX_RECORD.pack(digest, offset, dim))
+                new_index[digest] = (offset, dim)
+                offset += size
+
+        if self._maps[shard] is not None:
+            self._maps[shard].close()
+            self._maps[shard] = None
+        os.replace(data_tmp, self._data_path(shard))
+        os.replace(index_tmp, self._index_path(shard))
+
+        self._index[shard] = new_index
+        self._last_used[shard] = {d: last_used[d] for d in survivors}
+        index_stat = os.stat(self._index_path(shard))
+        self._seen[shard] = (index_stat.st_ino, index_stat.st_size)
+
+    # ------------------------------------------------------------------ stats
+    def stats(self) -> Dict[str, Any]:
+        """Counters for monitoring cache growth and effectiveness"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["bytes"] = sum(self._shard_bytes)
+        lookups = stats["hits"] + stats["misses"]
+        stats["entries"] = len(self)
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["max_bytes"] = self.max_bytes
+        stats["namespace"] = self.namespace
+        return stats
+
+    def close(self) -> None:
+        """Release the memory maps and lock files held by the cache"""
+        for shard, mapped in enumerate(self._maps):
+            if mapped is not None:
+                mapped.close()
+                self._maps[shard] = None
+        for shard, lock_file in enumerate(self._lock_files):
+            if lock_file is not None:
+                lock_file.close()
+                self._lock_files[shard] = None
+
+
+class MemoryEmbeddingCache:
+    """
+    Thread-safe in-memory LRU tier for embedding vectors, bounded in bytes.
+
+    Keys are ``(namespace, md5 digest)`` pairs so one instance can be shared by
+    every provider in the process regardless of the model they serve.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 ** 2):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, bytes], np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get_many(self, namespace: str, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Return cached vectors aligned with ``texts`` (``None`` for misses)"""
+        keys = [(namespace, EmbeddingCache.key(text)) for text in texts]
+        results: List[Optional[np.ndarray]] = []
+        with self._lock:
+            for key in keys:
+                vector = self._entries.get(key)
+                if vector is not None:
+                    self._entries.move_to_end(key)
+                results.append(vector)
+            hits = sum(1 for vector in results if vector is not None)
+            self._stats["hits"] += hits
+            self._stats["misses"] += len(keys) - hits
+        return results
+
+    def put_many(self, namespace: str, texts: Sequence[str], vectors: Sequence[Sequence[float]]) -> None:
+        """Insert vectors, evicting least recently used entries beyond the byte budget"""
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                key = (namespace, EmbeddingCache.key(text))
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    continue
+                array = np.array(vector, dtype=EmbeddingCache.DTYPE)
+                array.flags.writeable = False  # shared between callers
+                self._entries[key] = array
+                self._bytes += array.nbytes
+
+            while self._bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+                self._stats["evictions"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["bytes"] = self._bytes
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["max_bytes"] = self.max_bytes
+        return stats
+
+
+_memory_cache: Optional[MemoryEmbeddingCache] = None
+_memory_cache_lock = threading.Lock()
+
+
+def get_memory_cache(max_bytes: Optional[int] = None) -> MemoryEmbeddingCache:
+    """
+    Return the process-wide memory tier, creating it on first use.
+    A ``max_bytes`` passed later resizes the shared instance.
+    """
+    global _memory_cache
+    with _memory_cache_lock:
+        if _memory_cache is None:
+            _memory_cache = MemoryEmbeddingCache() if max_bytes is None else MemoryEmbeddingCache(max_bytes)
+        elif max_bytes is not None:
+            _memory_cache.max_bytes = max_bytes
+        return _memory_cache
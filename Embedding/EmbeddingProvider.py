@@ -1,97 +1,290 @@
-from sentence_transformers import SentenceTransformer
 from typing import List, Dict, Optional, Any
-import hashlib
-import json
-import os
 import asyncio
-from functools import lru_cache
+import atexit
+import threading
+import numpy as np
 from langchain.embeddings.base import Embeddings  # Import the base Embeddings class
 
+from Embedding.EmbeddingCache import EmbeddingCache, get_memory_cache
+from Embedding.QueryBatcher import QueryBatcher
+from Embedding.ModelRegistry import model_registry
+from Enums import EmbeddingBackend
+
 class EmbeddingProvider(Embeddings):  # Inherit from LangChain's Embeddings
     def __init__(self, model_name: str = 'mohamed2811/Muffakir_Embedding', 
                  cache_dir: str = '.embedding_cache',
-                 batch_size: int = 32):
-        self.model = SentenceTransformer(model_name)
+                 batch_size: int = 32,
+                 cache_shards: int = 16,
+                 revision: Optional[str] = None,
+                 max_cache_bytes: Optional[int] = None,
+                 memory_cache_bytes: Optional[int] = None,
+                 token_budget: Optional[int] = None,
+                 num_workers: int = 0,
+                 multiprocess_threshold: int = 2048,
+                 micro_batch_window_ms: Optional[float] = None,
+                 micro_batch_max: int = 32,
+                 device: Optional[str] = None,
+                 backend: EmbeddingBackend = EmbeddingBackend.TORCH):
+        self.model_name = model_name
+        self.revision = revision
+        self.device = device
+        self.backend = backend
         self.cache_dir = cache_dir
         self.batch_size = batch_size
-        
-        # Create cache directory if it doesn't exist
-        os.makedirs(cache_dir, exist_ok=True)
-    
-    def _get_cache_key(self, text: str) -> str:
-        """Generate a unique cache key for the input text"""
-        return hashlib.md5(text.encode('utf-8')).hexdigest()
-    
-    def _get_cache_path(self, cache_key: str) -> str:
-        """Get the file path for a cache key"""
-        return os.path.join(self.cache_dir, f"{cache_key}.json")
-    
-    def _check_cache(self, text: str) -> Optional[List[float]]:
-        """Check if embedding exists in cache"""
-        cache_key = self._get_cache_key(text)
-        cache_path = self._get_cache_path(cache_key)
-        
-        if os.path.exists(cache_path):
-            try:
-                with open(cache_path, 'r') as f:
-                    return json.load(f)
-            except Exception as e:
-                print(f"Cache read error: {e}")
-        return None
-    
-    def _save_to_cache(self, text: str, embedding: List[float]):
-        """Save embedding to cache"""
-        cache_key = self._get_cache_key(text)
-        cache_path = self._get_cache_path(cache_key)
-        
+        # When set, uncached texts are sorted by token length and batched by
+        # padded-token budget instead of a fixed count
+        self.token_budget = token_budget
+        self.batching_stats = {"batches": 0, "texts": 0, "real_tokens": 0,
+                               "padded_tokens": 0, "fixed_padded_tokens": 0}
+
+        # Opt-in multi-process encoding for large ingests (num_workers > 1)
+        self.num_workers = num_workers
+        self.multiprocess_threshold = multiprocess_threshold
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+        # The disk cache namespace needs the model dimension, so it is opened lazily too
+        self.cache_shards = cache_shards
+        self.max_cache_bytes = max_cache_bytes
+        self._cache: Optional[EmbeddingCache] = None
+        self._cache_lock = threading.Lock()
+
+        # Process-wide memory tier in front of the disk cache, shared by all providers
+        self.memory_cache = get_memory_cache(memory_cache_bytes)
+
+        # Optional micro-batcher coalescing concurrent query embeddings
+        self.batcher = None
+        if micro_batch_window_ms is not None:
+            self.batcher = QueryBatcher(self.embed_array, max_batch=micro_batch_max,
+                                        max_wait_ms=micro_batch_window_ms)
+
+    @property
+    def model(self):
+        """Shared model from the process-wide registry, loaded on first use"""
+        return model_registry.get_model(self.model_name, device=self.device,
+                                        revision=self.revision, backend=self.backend)
+
+    @property
+    def cache(self) -> EmbeddingCache:
+        """Sharded binary cache, namespaced so a model switch never serves stale vectors"""
+        if self._cache is None:
+            with self._cache_lock:
+                if self._cache is None:
+                    self._cache = EmbeddingCache(
+                        self.cache_dir,
+                        num_shards=self.cache_shards,
+                        namespace=self.cache_namespace(),
+                        max_bytes=self.max_cache_bytes,
+                    )
+        return self._cache
+
+    def cache_namespace(self) -> str:
+        """Cache namespace made of model name, revision, embedding dimension and backend"""
+        namespace = f"{self.model_name}@{self.revision or 'main'}-d{self.dimension}"
+        # ONNX / int8 vectors drift slightly from PyTorch ones, keep them apart
+        if self.backend != EmbeddingBackend.TORCH:
+            namespace += f"-{self.backend.value}"
+        return namespace
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss/eviction/byte counters of the memory and disk cache tiers"""
+        return {"memory": self.memory_cache.stats(), "disk": self.cache.stats()}
+
+    def _lookup(self, texts: List[str]) -> List[Optional[Any]]:
+        """Resolve texts from the memory tier first, then the disk tier"""
+        namespace = self.cache.namespace
+        results = self.memory_cache.get_many(namespace, texts)
+
+        missing = [i for i, vector in enumerate(results) if vector is None]
+        if missing:
+            from_disk = self.cache.get_many([texts[i] for i in missing])
+            promoted = [(texts[i], vector) for i, vector in zip(missing, from_disk) if vector is not None]
+            for i, vector in zip(missing, from_disk):
+                results[i] = vector
+            if promoted:
+                self.memory_cache.put_many(namespace, *zip(*promoted))
+
+        return results
+
+    def _store(self, texts: List[str], embeddings) -> None:
+        """Write freshly computed embeddings to both cache tiers"""
+        self.memory_cache.put_many(self.cache.namespace, texts, embeddings)
         try:
-            with open(cache_path, 'w') as f:
-                json.dump(embedding, f)
+            self.cache.put_many(texts, embeddings)
         except Exception as e:
             print(f"Cache write error: {e}")
-    
-    @lru_cache(maxsize=100)  
+
+    @property
+    def dimension(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+    def embed_array(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed texts with batching and caching.
+
+        Returns a contiguous float32 matrix of shape ``(len(texts), dim)``;
+        this is the native path, the list-returning methods only adapt it.
+        """
+        results = np.empty((len(texts), self.dimension), dtype=np.float32)
+
+        # One bulk lookup for the whole batch instead of one file per text
+        cached = self._lookup(texts)
+        uncached_indices = []
+        for i, vector in enumerate(cached):
+            if vector is None:
+                uncached_indices.append(i)
+            else:
+                results[i] = vector
+
+        batch = [texts[i] for i in uncached_indices]
+        if not batch:
+            # fully cached: no tokenizer or model call at all
+            return results
+        if self.num_workers > 1 and len(batch) >= self.multiprocess_threshold:
+            embeddings = self._encode_multi_process(batch)
+            self._store(batch, embeddings)
+            results[uncached_indices] = embeddings
+            return results
+
+        if self.token_budget:
+            batches = self._plan_length_batches(batch)
+        else:
+            batches = [list(range(i, min(i + self.batch_size, len(batch))))
+                       for i in range(0, len(batch), self.batch_size)]
+
+        for positions in batches:
+            sub_batch = [batch[p] for p in positions]
+            sub_indices = [uncached_indices[p] for p in positions]
+
+            embeddings = self.model.encode(
+                sub_batch, batch_size=len(sub_batch), convert_to_numpy=True
+            ).astype(np.float32, copy=False)
+            self._store(sub_batch, embeddings)
+            # Scatter back so callers always get rows in their original order
+            results[sub_indices] = embeddings
+
+        return results
+
+    # ------------------------------------------------------------------ worker pool
+    def start_pool(self) -> None:
+        """Start the encoding worker processes (no-op if already running)"""
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = self.model.start_multi_process_pool(target_devices=["cpu"] * self.num_workers)
+                atexit.register(self.stop_pool)
+
+    def stop_pool(self) -> None:
+        """Terminate the encoding worker processes"""
+        with self._pool_lock:
+            if self._pool is not None:
+                self.model.stop_multi_process_pool(self._pool)
+                self._pool = None
+
+    def _encode_multi_process(self, texts: List[str]) -> np.ndarray:
+        """
+        Shard texts across the worker pool; results come back in input order.
+        Texts are sent longest-first so every shard holds similarly sized inputs.
+        """
+        self.start_pool()
+
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]), reverse=True)
+        chunk_size = max(self.batch_size, -(-len(texts) // (self.num_workers * 4)))
+        encoded = self.model.encode_multi_process(
+            [texts[i] for i in order],
+            self._pool,
+            batch_size=self.batch_size,
+            chunk_size=chunk_size,
+        ).astype(np.float32, copy=False)
+
+        embeddings = np.empty_like(encoded)
+        embeddings[order] = encoded
+        return embeddings
+
+    def _token_lengths(self, texts: List[str]) -> List[int]:
+        """Number of tokens each text occupies after truncation"""
+        encoded = self.model.tokenizer(
+            texts,
+            add_special_tokens=True,
+            truncation=True,
+            max_length=self.model.max_seq_length,
+        )
+        return [len(ids) for ids in encoded["input_ids"]]
+
+    def _plan_length_batches(self, texts: List[str]) -> List[List[int]]:
+        """
+        Group texts of similar length so each batch stays within ``token_budget``
+        padded tokens (batch size x longest text). Longest texts go first.
+        Returns positions into ``texts``.
+        """
+        if not texts:
+            return []
+        lengths = self._token_lengths(texts)
+        order = sorted(range(len(texts)), key=lambda i: lengths[i], reverse=True)
+
+        batches: List[List[int]] = []
+        current: List[int] = []
+        for i in order:
+            longest = lengths[current[0]] if current else lengths[i]
+            if current and (len(current) + 1) * longest > self.token_budget:
+                batches.append(current)
+                current = []
+            current.append(i)
+        if current:
+            batches.append(current)
+
+        real = sum(lengths)
+        padded = sum(len(b) * lengths[b[0]] for b in batches)
+        # What fixed-size batching in arrival order would have padded to, for comparison
+        fixed = sum(
+            len(chunk) * max(chunk)
+            for chunk in (lengths[i:i + self.batch_size] for i in range(0, len(lengths), self.batch_size))
+        )
+
+        self.batching_stats["batches"] += len(batches)
+        self.batching_stats["texts"] += len(texts)
+        self.batching_stats["real_tokens"] += real
+        self.batching_stats["padded_tokens"] += padded
+        self.batching_stats["fixed_padded_tokens"] += fixed
+        return batches
+
+    def padding_efficiency(self) -> Dict[str, float]:
+        """
+        Share of real (non-padding) tokens in encoded batches, for tuning
+        ``token_budget``: 1.0 means no padding at all.
+        """
+        stats = self.batching_stats
+        real = stats["real_tokens"]
+        return {
+            "batches": stats["batches"],
+            "texts": stats["texts"],
+            "avg_batch_size": stats["texts"] / stats["batches"] if stats["batches"] else 0.0,
+            "padding_efficiency": real / stats["padded_tokens"] if stats["padded_tokens"] else 1.0,
+            "fixed_batching_efficiency": real / stats["fixed_padded_tokens"] if stats["fixed_padded_tokens"] else 1.0,
+        }
+
+    def embed_query_array(self, text: str) -> np.ndarray:
+        """Embed a single query as a float32 vector"""
+        if self.batcher is not None:
+            # Cache hits answer immediately; only misses wait for the batch window
+            cached = self.memory_cache.get_many(self.cache.namespace, [text])[0]
+            if cached is not None:
+                return cached
+            return self.batcher.embed(text)
+        return self.embed_array([text])[0]
+
     def embed_single(self, text: str) -> List[float]:
         """Embed a single text with caching"""
-     
-        cached = self._check_cache(text)
-        if cached:
-            return cached
-        
-        embedding = self.model.encode(text).tolist()
-        self._save_to_cache(text, embedding)
-        return embedding
+        return self.embed_query_array(text).tolist()
     
     def embed(self, texts: List[str]) -> List[List[float]]:
-        """Embed multiple texts with batching and caching"""
-        results = []
-        batch = []
-        uncached_indices = []
-        
-        for i, text in enumerate(texts):
-            cached = self._check_cache(text)
-            if cached:
-                results.append(cached)
-            else:
-                results.append(None)  
-                batch.append(text)
-                uncached_indices.append(i)
-        
-        if batch:
-            for i in range(0, len(batch), self.batch_size):
-                sub_batch = batch[i:i+self.batch_size]
-                sub_indices = uncached_indices[i:i+self.batch_size]
-                
-                embeddings = self.model.encode(sub_batch).tolist()
-                
-                for j, (text, embedding) in enumerate(zip(sub_batch, embeddings)):
-                    self._save_to_cache(text, embedding)
-                    results[sub_indices[j]] = embedding
-        
-        return results
+        """List adapter over embed_array"""
+        return self.embed_array(texts).tolist()
     
     async def embed_async(self, texts: List[str]) -> List[List[float]]:
         """Async version of embed method"""
+        if self.batcher is not None:
+            vectors = await self.batcher.embed_async(texts)
+            return [vector.tolist() for vector in vectors]
         loop = asyncio.get_event_loop()
         return await loop.run_in_executor(None, self.embed, texts)
     
@@ -102,4 +295,35 @@ class EmbeddingProvider(Embeddings):  # Inherit from LangChain's Embeddings
     
     def embed_query(self, text: str) -> List[float]:
         """Embed a query using the underlying model"""
-        return self.embed_single(text)
\ No newline at end of file
+        return self.embed_single(text)
+
+
+_providers: Dict[tuple, EmbeddingProvider] = {}
+_providers_lock = threading.Lock()
+
+
+def get_embedding_provider(model_name: str = 'mohamed2811/Muffakir_Embedding',
+                           device: Optional[str] = None,
+                           backend: Optional[EmbeddingBackend] = None,
+                           **kwargs: Any) -> EmbeddingProvider:
+    """
+    Return the process-wide EmbeddingProvider for a model and device.
+
+    The first call creates it with ``kwargs`` (init.py does this with the
+    configured settings); later calls get the same instance and ignore kwargs.
+    Without an explicit ``backend`` any provider already registered for the
+    model and device is returned, whatever backend it runs.
+    """
+    with _providers_lock:
+        if backend is None:
+            for (name, dev, _), provider in _providers.items():
+                if name == model_name and dev == (device or "auto"):
+                    return provider
+            backend = EmbeddingBackend.TORCH
+
+        key = (model_name, device or "auto", backend)
+        provider = _providers.get(key)
+        if provider is None:
+            provider = EmbeddingProvider(model_name=model_name, device=device, backend=backend, **kwargs)
+            _providers[key] = provider
+        return provider
\ No newline at end of file
@@ -0,0 +1,136 @@
+from typing import Any, Dict, Optional, Tuple
+import logging
+import os
+import re
+import threading
+
+from sentence_transformers import SentenceTransformer
+
+from Enums import EmbeddingBackend
+
+ModelKey = Tuple[str, Optional[str], str, EmbeddingBackend]
+
+
+class ModelRegistry:
+    """
+    Process-wide registry of SentenceTransformer models.
+
+    Each (model name, revision, device, backend) is loaded once, on first use,
+    and the same instance is handed to every caller, so several managers in one
+    process never hold duplicate copies of the weights.
+
+    Besides PyTorch, models can run through ONNX Runtime, optionally with
+    dynamic int8 quantization; exported models are kept under ``onnx_dir``.
+    """
+
+    def __init__(self, onnx_dir: str = '.onnx_models', quantization_config: str = 'avx2'):
+        self.onnx_dir = onnx_dir
+        self.quantization_config = quantization_config
+        self._models: Dict[ModelKey, SentenceTransformer] = {}
+        self._locks: Dict[ModelKey, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    @staticmethod
+    def _key(model_name: str, revision: Optional[str], device: Optional[str],
+             backend: EmbeddingBackend = EmbeddingBackend.TORCH) -> ModelKey:
+        return (model_name, revision, device or "auto", backend)
+
+    def get_model(self, model_name: str, device: Optional[str] = None,
+                  revision: Optional[str] = None,
+                  backend: EmbeddingBackend = EmbeddingBackend.TORCH) -> SentenceTransformer:
+        """Return the shared model, loading it on the first call"""
+        key = self._key(model_name, revision, device, backend)
+        model = self._models.get(key)
+        if model is not None:
+            return model
+
+        with self._lock:
+            key_lock = self._locks.setdefault(key, threading.Lock())
+
+        # Per-model lock: loading one model doesn't block lookups of another
+        with key_lock:
+            model = self._models.get(key)
+            if model is None:
+                self.logger.info(f"Loading embedding model {model_name} (device={key[2]}, backend={backend.value})")
+                model = self._load(model_name, device, revision, backend)
+                self._models[key] = model
+        return model
+
+    def _load(self, model_name: str, device: Optional[str], revision: Optional[str],
+              backend: EmbeddingBackend) -> SentenceTransformer:
+        if backend == EmbeddingBackend.TORCH:
+            return SentenceTransformer(model_name, device=device, revision=revision)
+
+        if backend == EmbeddingBackend.ONNX:
+            # Exports to ONNX on the fly when the repo doesn't ship an ONNX file
+            return SentenceTransformer(model_name, device=device, revision=revision, backend="onnx")
+
+        if backend == EmbeddingBackend.ONNX_INT8:
+            export_dir, file_name = self.export_quantized(model_name, revision)
+            return SentenceTransformer(
+                export_dir, device=device, backend="onnx",
+                model_kwargs={"file_name": file_name},
+            )
+
+        raise ValueError(f"Unsupported embedding backend: {backend}")
+
+    def export_quantized(self, model_name: str, revision: Optional[str] = None) -> Tuple[str, str]:
+        """
+        Export the model to ONNX and apply dynamic int8 quantization, once.
+        Returns the local model directory and the quantized file name inside it.
+        """
+        from sentence_transformers import export_dynamic_quantized_onnx_model
+
+        safe_name = re.sub(r'[^A-Za-z0-9._-]', '_', f"{model_name}@{revision or 'main'}")
+        export_dir = os.path.join(self.onnx_dir, safe_name)
+        file_name = f"onnx/model_qint8_{self.quantization_config}.onnx"
+
+        if not os.path.exists(os.path.join(export_dir, file_name)):
+            self.logger.info(f"Exporting {model_name} to int8 ONNX ({self.quantization_config}) in {export_dir}")
+            onnx_model = SentenceTransformer(model_name, revision=revision, backend="onnx")
+            onnx_model.save(export_dir)
+            export_dynamic_quantized_onnx_model(
+                onnx_model,
+                quantization_config=self.quantization_config,
+                model_name_or_path=export_dir,
+                file_suffix=f"qint8_{self.quantization_config}",
+            )
+
+        return export_dir, file_name
+
+    def is_loaded(self, model_name: str, device: Optional[str] = None, revision: Optional[str] = None,
+                  backend: EmbeddingBackend = EmbeddingBackend.TORCH) -> bool:
+        return self._key(model_name, revision, device, backend) in self._models
+
+    def unload(self, model_name: str, device: Optional[str] = None, revision: Optional[str] = None,
+               backend: EmbeddingBackend = EmbeddingBackend.TORCH) -> None:
+        """Drop the registry's reference so the weights can be freed"""
+        with self._lock:
+            self._models.pop(self._key(model_name, revision, device, backend), None)
+
+    def memory_report(self) -> Dict[str, Dict[str, Any]]:
+        """Parameter count and weight bytes of every loaded model"""
+        report = {}
+        for (model_name, revision, device, backend), model in list(self._models.items()):
+            name = f"{model_name}@{revision or 'main'} ({device}, {backend.value})"
+            if backend == EmbeddingBackend.TORCH:
+                tensors = list(model.parameters()) + list(model.buffers())
+                report[name] = {
+                    "parameters": sum(t.numel() for t in model.parameters()),
+                    "bytes": sum(t.numel() * t.element_size() for t in tensors),
+                    "device": str(model.device),
+                }
+            else:
+                # ONNX Runtime owns the weights; the model file size is the closest measure
+                model_path = getattr(model[0].auto_model, "model_path", None)
+                report[name] = {
+                    "parameters": None,
+                    "bytes": os.path.getsize(model_path) if model_path and os.path.exists(model_path) else None,
+                    "device": device,
+                }
+        return report
+
+
+# singleton shared by every EmbeddingProvider in the process
+model_registry = ModelRegistry()
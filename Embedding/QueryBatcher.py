@@ -0,0 +1,134 @@
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, List, Tuple
+import asyncio
+import logging
+import queue
+import threading
+import time
+
+import numpy as np
+
+
+class QueryBatcher:
+    """
+    Coalesces concurrent single-text embedding requests into one forward pass.
+
+    Callers submit a text and get a future back. A background thread waits for
+    the first request, keeps collecting for up to ``max_wait_ms`` (or until
+    ``max_batch`` requests are queued), encodes the whole group with one call
+    to ``embed_fn`` and resolves every caller's future with its own row.
+
+    Futures cancelled by their caller (e.g. an ``asyncio.wait_for`` timeout)
+    are skipped. Blocking callers wait at most ``timeout`` seconds and then
+    embed their text directly, so a stalled worker never hangs a query.
+    """
+
+    def __init__(self, embed_fn: Callable[[List[str]], np.ndarray],
+                 max_batch: int = 32, max_wait_ms: float = 5.0, timeout: float = 30.0):
+        self.embed_fn = embed_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.timeout = timeout
+        self.logger = logging.getLogger(__name__)
+
+        self._queue: "queue.Queue[Tuple[str, Future]]" = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._stats = {"requests": 0, "batches": 0, "largest_batch": 0, "cancelled": 0, "fallbacks": 0}
+        self._closed = False
+
+        self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, text: str) -> Future:
+        """Queue a text for embedding; the future resolves to a float32 vector"""
+        if self._closed:
+            raise RuntimeError("QueryBatcher is closed")
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def embed(self, text: str) -> np.ndarray:
+        """Blocking helper: submit and wait for the vector, embedding directly on timeout"""
+        future = self.submit(text)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()
+            self.logger.warning(f"Embedding batcher did not answer within {self.timeout}s, embedding directly")
+            with self._stats_lock:
+                self._stats["fallbacks"] += 1
+            return self.embed_fn([text])[0]
+
+    async def embed_async(self, texts: List[str]) -> List[np.ndarray]:
+        """Await the vectors of several texts without blocking the event loop"""
+        futures = [asyncio.wrap_future(self.submit(text)) for text in texts]
+        return list(await asyncio.gather(*futures))
+
+    def _collect(self) -> List[Tuple[str, Future]]:
+        """Block for one request, then gather more until the window or batch fills"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            items = self._collect()
+            batch = [item for item in items if item[1] is not None]
+            if batch:
+                try:
+                    self._serve(batch)
+                except Exception:
+                    # never let one bad batch stop the worker
+                    self.logger.exception("Embedding batcher failed to serve a batch")
+            # A ``None`` future is the shutdown sentinel queued by close()
+            if len(batch) < len(items):
+                return
+
+    def _serve(self, batch: List[Tuple[str, Future]]) -> None:
+        # Drop requests whose caller has already given up; the rest can no longer be cancelled
+        live = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+        if len(live) < len(batch):
+            with self._stats_lock:
+                self._stats["cancelled"] += len(batch) - len(live)
+        batch = live
+        if not batch:
+            return
+
+        # Identical queries from different sessions share one row
+        unique = list(dict.fromkeys(text for text, _ in batch))
+        try:
+            vectors = self.embed_fn(unique)
+            rows = dict(zip(unique, vectors))
+        except BaseException as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for text, future in batch:
+            if not future.done():
+                future.set_result(rows[text])
+
+        with self._stats_lock:
+            self._stats["requests"] += len(batch)
+            self._stats["batches"] += 1
+            self._stats["largest_batch"] = max(self._stats["largest_batch"], len(unique))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["avg_batch_size"] = stats["requests"] / stats["batches"] if stats["batches"] else 0.0
+        return stats
+
+    def close(self) -> None:
+        """Stop the worker once the queued requests are served"""
+        self._closed = True
+        self._queue.put(("", None))
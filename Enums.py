@@ -21,6 +21,7 @@ class RetrievalMethod(Enum):
     SIMILARITY_SEARCH = "similarity_search"
     HYBRID = "hybrid"
     CONTEXTUAL = "contextual"
+    FEDERATED = "federated"
 
 
 @unique
@@ -28,3 +29,47 @@ class SummaryStrategy(Enum):
     DIRECT = "direct"
     CLUSTERING = "clustering"
     AUTO = "auto"
+
+
+@unique
+class EmbeddingBackend(Enum):
+    TORCH = "torch"
+    ONNX = "onnx"
+    ONNX_INT8 = "onnx_int8"
+
+
+@unique
+class VectorQuantization(Enum):
+    INT8 = "int8"
+    BINARY = "binary"
+
+
+@unique
+class VectorBackend(Enum):
+    CHROMA = "chroma"
+    IN_PROCESS = "in_process"
+
+
+@unique
+class ScoreNormalization(Enum):
+    NONE = "none"
+    MIN_MAX = "min_max"
+    Z_SCORE = "z_score"
+
+
+@unique
+class LexicalAnalyzer(Enum):
+    SIMPLE = "simple"
+    ARABIC = "arabic"
+
+
+@unique
+class FusionMethod(Enum):
+    RECIPROCAL_RANK = "rrf"
+    NORMALIZED_SCORE = "normalized_score"
+
+
+@unique
+class CompressionMode(Enum):
+    LLM = "llm"
+    EXTRACTIVE = "extractive"
@@ -113,9 +113,8 @@ class EvaluationDataHandler:
         generated_questions = self._generate_questions(answer)
         if not generated_questions: return 0.0
         
-        question_embed = self.embedding_provider.embed_query(question)
-        answer_embeds = self.embedding_provider.embed_documents(generated_questions)
-        return cosine_similarity([question_embed], answer_embeds)[0].mean()
+        embeds = self.embedding_provider.embed_array([question] + generated_questions)
+        return cosine_similarity(embeds[:1], embeds[1:])[0].mean()
 
     def _generate_questions(self, answer: str) -> List[str]:
         """Generate questions from answer"""
@@ -1,4 +1,4 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from langchain.schema import Document
 from typing import TYPE_CHECKING
 
@@ -11,15 +11,18 @@ class DocumentRetriever:
         """
         self.pipeline_manager = pipeline_manager
 
-    def retrieve_documents(self, query: str, k: int = 2) -> List[Dict[str, Any]]:
+    def retrieve_documents(self, query: str, k: int = 2,
+                           filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """
         Retrieves top-k similar documents and extracts source & page_content.
+        An optional metadata ``filter`` (e.g. one book or page range) is pushed
+        down to the vector store.
         Returns a list of dicts with keys:
           - "source": the document’s source metadata
           - "page_content": the text
         """
         # Now binds k to the new k parameter, not to the enum
-        results = self.pipeline_manager.query_similar_documents(query, k)
+        results = self.pipeline_manager.query_similar_documents(query, k, filter=filter)
 
         return [
             {
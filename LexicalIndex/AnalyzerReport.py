@@ -0,0 +1,69 @@
+"""
+Vocabulary size and throughput of the lexical analyzers on the same texts.
+
+Usage:
+    python -m LexicalIndex.AnalyzerReport --texts path/to/chunks.txt
+    python -m LexicalIndex.AnalyzerReport --db-path ./DB --collection Book
+"""
+from typing import Any, Dict, List, Optional
+import argparse
+import time
+from collections import Counter
+
+from Enums import LexicalAnalyzer
+from LexicalIndex.BM25Index import make_analyzer
+
+
+def analyzer_report(texts: List[str], kind: LexicalAnalyzer) -> Dict[str, Any]:
+    """Vocabulary, token counts and analysis speed of one analyzer"""
+    analyzer = make_analyzer(kind)
+    start = time.perf_counter()
+    token_lists = [analyzer(text) for text in texts]
+    seconds = time.perf_counter() - start
+
+    counts = Counter(token for tokens in token_lists for token in tokens)
+    tokens = sum(counts.values())
+    return {
+        "analyzer": kind.value,
+        "docs": len(texts),
+        "tokens": tokens,
+        "vocabulary": len(counts),
+        "singleton_terms": sum(1 for c in counts.values() if c == 1),
+        "tokens_per_doc": tokens / len(texts) if texts else 0.0,
+        "docs_per_s": len(texts) / seconds if seconds else 0.0,
+        "mb_per_s": sum(len(t.encode("utf-8")) for t in texts) / 1024 ** 2 / seconds if seconds else 0.0,
+    }
+
+
+def format_report(results: List[Dict[str, Any]]) -> str:
+    header = f"{'analyzer':<10} {'docs':>8} {'tokens':>10} {'vocab':>9} {'singletons':>10} {'tok/doc':>8} {'docs/s':>9} {'MB/s':>7}"
+    lines = [header, "-" * len(header)]
+    for r in results:
+        lines.append(
+            f"{r['analyzer']:<10} {r['docs']:>8} {r['tokens']:>10} {r['vocabulary']:>9} {r['singleton_terms']:>10} "
+            f"{r['tokens_per_doc']:>8.1f} {r['docs_per_s']:>9.0f} {r['mb_per_s']:>7.2f}"
+        )
+    return "\n".join(lines)
+
+
+def load_texts(texts_file: Optional[str], db_path: Optional[str], collection: str) -> List[str]:
+    if texts_file:
+        with open(texts_file, encoding="utf-8") as f:
+            return [line.strip() for line in f if line.strip()]
+    from VectorDB.VectorStoreBackend import ChromaBackend
+    from VectorDB.PagedCorpus import PagedCorpus
+    corpus = PagedCorpus(ChromaBackend(collection, db_path, embedding_function=None))
+    return [text for _, texts, _ in corpus.iter_pages() for text in texts]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare lexical analyzers")
+    parser.add_argument("--texts", help="UTF-8 file with one text per line")
+    parser.add_argument("--db-path", help="Persist directory of a Chroma collection (when --texts is not given)")
+    parser.add_argument("--collection", default="Book")
+    args = parser.parse_args()
+    if not args.texts and not args.db_path:
+        parser.error("one of --texts or --db-path is required")
+
+    corpus_texts = load_texts(args.texts, args.db_path, args.collection)
+    print(format_report([analyzer_report(corpus_texts, kind) for kind in LexicalAnalyzer]))
@@ -0,0 +1,81 @@
+from typing import FrozenSet, Iterable, List, Optional
+import re
+
+
+# harakat, tanween, shadda, sukun, superscript alef and Quranic marks
+_DIACRITICS = re.compile(r"[\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06ED]")
+_TATWEEL = "\u0640"
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+_CHAR_MAP = str.maketrans({
+    "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا",
+    "ى": "ي",
+    "ة": "ه",
+    "ؤ": "و",
+    "ئ": "ي",
+    # Arabic-Indic and Persian digits -> ASCII
+    **{chr(0x0660 + i): str(i) for i in range(10)},
+    **{chr(0x06F0 + i): str(i) for i in range(10)},
+})
+
+# Light10 affixes (Larkey et al.), written in normalized form
+_PREFIXES = ("وال", "بال", "كال", "فال", "لل", "ال")
+_SUFFIXES = ("ها", "ان", "ات", "ون", "ين", "يه", "ه", "ي")
+
+DEFAULT_STOPWORDS = frozenset("""
+في من على الى عن مع هذا هذه ذلك تلك هو هي هم هن انا نحن انت انتم التي الذي الذين اللذان اللتان
+ان او ثم قد لقد لا لم لن ما ماذا متي اين كيف كل بعض غير بين حتي اذا اذ لو لولا الا اما كان كانت
+يكون تكون كانوا عند عندما منذ قبل بعد حيث ايضا فقط لدي لها له لهم به بها فيه فيها منه منها عليه
+عليها اليه اليها هنا هناك او و ف ب ل ك يا اي ليس ليست مثل نحو دون
+""".split())
+
+
+class ArabicAnalyzer:
+    """
+    Analyzer for Arabic lexical retrieval.
+
+    Text is normalized (diacritics and tatweel removed; alef, hamza, yaa and
+    taa marbuta variants folded; digits to ASCII), split into word tokens,
+    stripped of stopwords and light-stemmed with the Light10 prefix/suffix
+    rules. Queries and chunks must go through the same analyzer, so ``name``
+    is stored with the index and a change forces a rebuild.
+    """
+
+    def __init__(self, stem: bool = True, stopwords: Optional[Iterable[str]] = None,
+                 min_length: int = 2):
+        self.stem_tokens = stem
+        self.min_length = min_length
+        self.stopwords: FrozenSet[str] = frozenset(
+            self.normalize(word) for word in (DEFAULT_STOPWORDS if stopwords is None else stopwords)
+        )
+        self.name = f"arabic-light10{'' if stem else '-nostem'}-v1"
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        text = _DIACRITICS.sub("", text).replace(_TATWEEL, "")
+        return text.translate(_CHAR_MAP).lower()
+
+    @staticmethod
+    def stem(token: str) -> str:
+        """Light10: strip one leading waw, one article prefix, then suffixes, keeping >= 2 letters"""
+        if len(token) >= 4 and token.startswith("و"):
+            token = token[1:]
+        for prefix in _PREFIXES:
+            if token.startswith(prefix) and len(token) - len(prefix) >= 2:
+                token = token[len(prefix):]
+                break
+        for suffix in _SUFFIXES:
+            if token.endswith(suffix) and len(token) - len(suffix) >= 2:
+                token = token[:-len(suffix)]
+        return token
+
+    def __call__(self, text: str) -> List[str]:
+        tokens = []
+        for token in _TOKEN.findall(self.normalize(text)):
+            if token in self.stopwords:
+                continue
+            if self.stem_tokens:
+                token = self.stem(token)
+            if len(token) >= self.min_length and token not in self.stopwords:
+                tokens.append(token)
+        return tokens
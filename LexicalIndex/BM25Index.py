@@ -0,0 +1,340 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+import json
+import logging
+import math
+import os
+import re
+import shutil
+import threading
+from collections import Counter
+
+import numpy as np
+
+from Enums import LexicalAnalyzer
+from LexicalIndex.ArabicAnalyzer import ArabicAnalyzer
+
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def simple_tokenize(text: str) -> List[str]:
+    """Lower-cased word tokens (the analyzer used when none is given)"""
+    return _TOKEN.findall(text.lower())
+
+
+simple_tokenize.name = "simple-v1"
+
+
+def make_analyzer(kind: LexicalAnalyzer) -> Callable[[str], List[str]]:
+    if kind == LexicalAnalyzer.ARABIC:
+        return ArabicAnalyzer()
+    if kind == LexicalAnalyzer.SIMPLE:
+        return simple_tokenize
+    raise ValueError(f"Unsupported lexical analyzer: {kind}")
+
+
+class _Segment:
+    """
+    One immutable segment: a term dictionary in memory, postings memory-mapped.
+
+    Files under the segment directory:
+      - ``terms.json``: term -> [start, df] into the postings arrays
+      - ``postings.i32`` / ``tfs.u16``: segment-local doc rows and term frequencies, grouped by term
+      - ``doc_lens.i32``: token count of every doc
+      - ``ids.txt``: chunk id of every doc
+      - ``tokens.bin`` / ``token_offsets.i64``: every doc's analyzed token stream
+        (space separated UTF-8) and its end offset, so merges never re-analyze
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.name = os.path.basename(path)
+        with open(os.path.join(path, "terms.json"), encoding="utf-8") as f:
+            self.terms: Dict[str, List[int]] = json.load(f)
+        with open(os.path.join(path, "ids.txt"), encoding="utf-8") as f:
+            self.ids = f.read().splitlines()
+        self.doc_lens = self._map("doc_lens.i32", np.int32)
+        self.postings = self._map("postings.i32", np.int32)
+        self.tfs = self._map("tfs.u16", np.uint16)
+        self.token_offsets = self._map("token_offsets.i64", np.int64)
+        self.token_stream = self._map("tokens.bin", np.uint8)
+
+    def _map(self, name: str, dtype) -> np.ndarray:
+        file = os.path.join(self.path, name)
+        if os.path.getsize(file) == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(file, dtype=dtype, mode="r")
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def tokens(self, row: int) -> List[str]:
+        start = int(self.token_offsets[row - 1]) if row else 0
+        end = int(self.token_offsets[row])
+        return bytes(self.token_stream[start:end]).decode("utf-8").split() if end > start else []
+
+    def term_postings(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        entry = self.terms.get(term)
+        if entry is None:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.uint16)
+        start, df = entry
+        return self.postings[start:start + df], self.tfs[start:start + df]
+
+    @staticmethod
+    def write(path: str, ids: Sequence[str], token_lists: Sequence[List[str]]) -> "_Segment":
+        inverted: Dict[str, List[Tuple[int, int]]] = {}
+        for row, tokens in enumerate(token_lists):
+            for term, tf in Counter(tokens).items():
+                inverted.setdefault(term, []).append((row, min(tf, 65535)))
+
+        terms, postings, tfs, start = {}, [], [], 0
+        for term in sorted(inverted):
+            entries = inverted[term]
+            terms[term] = [start, len(entries)]
+            postings.extend(row for row, _ in entries)
+            tfs.extend(tf for _, tf in entries)
+            start += len(entries)
+
+        tmp = path + ".tmp"
+        os.makedirs(tmp, exist_ok=True)
+        np.asarray(postings, dtype=np.int32).tofile(os.path.join(tmp, "postings.i32"))
+        np.asarray(tfs, dtype=np.uint16).tofile(os.path.join(tmp, "tfs.u16"))
+        np.asarray([len(t) for t in token_lists], dtype=np.int32).tofile(os.path.join(tmp, "doc_lens.i32"))
+        streams = [" ".join(tokens).encode("utf-8") for tokens in token_lists]
+        with open(os.path.join(tmp, "tokens.bin"), "wb") as f:
+            f.write(b"".join(streams))
+        np.cumsum([len(stream) for stream in streams], dtype=np.int64).tofile(os.path.join(tmp, "token_offsets.i64"))
+        with open(os.path.join(tmp, "terms.json"), "w", encoding="utf-8") as f:
+            json.dump(terms, f, ensure_ascii=False)
+        with open(os.path.join(tmp, "ids.txt"), "w", encoding="utf-8") as f:
+            f.writelines(chunk_id + "\n" for chunk_id in ids)
+        os.replace(tmp, path)
+        return _Segment(path)
+
+
+class BM25Index:
+    """
+    Persistent BM25 inverted index over a collection's chunks.
+
+    Every ``add`` writes a new immutable segment; deletes and replaced chunks
+    are recorded as tombstones. Once there are more than ``max_segments``
+    segments, all but the largest are merged into one, which also drops
+    tombstoned docs. A query only reads the postings of its own terms, so its
+    cost follows the postings touched and not the corpus size.
+
+    Files under ``path``: ``segments.json`` (live segments and tombstones)
+    and one ``seg_<n>`` directory per segment (see _Segment).
+    """
+
+    def __init__(self, path: str, analyzer: Optional[Callable[[str], List[str]]] = None,
+                 k1: float = 1.5, b: float = 0.75, max_segments: int = 8):
+        self.path = path
+        self.analyzer = analyzer or simple_tokenize
+        self.analyzer_name = getattr(self.analyzer, "name", getattr(self.analyzer, "__name__", "custom"))
+        self.k1 = k1
+        self.b = b
+        self.max_segments = max_segments
+        self.logger = logging.getLogger(__name__)
+        os.makedirs(path, exist_ok=True)
+
+        self.segments: List[_Segment] = []
+        # chunk id -> segment number; the id's docs in segments numbered below it are dead
+        self.tombstones: Dict[str, int] = {}
+        self._next_segment = 0
+        self._docs = 0
+        self._total_len = 0
+        self._live_ids: Set[str] = set()
+        self._lock = threading.RLock()
+        self._load()
+
+    # ------------------------------------------------------------------ files
+    def _manifest_file(self) -> str:
+        return os.path.join(self.path, "segments.json")
+
+    def _load(self) -> None:
+        if not os.path.exists(self._manifest_file()):
+            return
+        with open(self._manifest_file(), encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("analyzer") != self.analyzer_name:
+            # Built with another analyzer: its terms do not match ours, start over
+            self.logger.info(f"BM25 index at {self.path} uses {manifest.get('analyzer')}, "
+                             f"not {self.analyzer_name}; it will be rebuilt")
+            return
+        self.segments = [_Segment(os.path.join(self.path, name)) for name in manifest["segments"]]
+        self.tombstones = manifest["tombstones"]
+        self._next_segment = manifest["next_segment"]
+        self._refresh_stats()
+
+    def _save(self) -> None:
+        manifest = {
+            "segments": [segment.name for segment in self.segments],
+            "tombstones": self.tombstones,
+            "next_segment": self._next_segment,
+            "analyzer": self.analyzer_name,
+        }
+        tmp = self._manifest_file() + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp, self._manifest_file())
+
+        # segments no longer listed (merged away) can go
+        live = {segment.name for segment in self.segments}
+        for name in os.listdir(self.path):
+            if name.startswith("seg_") and name not in live:
+                shutil.rmtree(os.path.join(self.path, name), ignore_errors=True)
+
+    @staticmethod
+    def _number(segment: _Segment) -> int:
+        return int(segment.name[len("seg_"):])
+
+    def _is_dead(self, chunk_id: str, segment: _Segment) -> bool:
+        return self.tombstones.get(chunk_id, -1) > self._number(segment)
+
+    def _refresh_stats(self) -> None:
+        self._docs = sum(len(segment) for segment in self.segments)
+        self._total_len = sum(int(segment.doc_lens.sum()) for segment in self.segments)
+        self._live_ids = {
+            chunk_id for segment in self.segments for chunk_id in segment.ids
+            if not self._is_dead(chunk_id, segment)
+        }
+
+    def __len__(self) -> int:
+        return len(self._live_ids)
+
+    def __contains__(self, chunk_id: str) -> bool:
+        return chunk_id in self._live_ids
+
+    # ------------------------------------------------------------------ writes
+    def add(self, ids: Sequence[str], texts: Sequence[str],
+            token_lists: Optional[Sequence[List[str]]] = None) -> None:
+        """Index chunks as a new segment; ``token_lists`` skips re-analyzing texts"""
+        if not ids:
+            return
+        token_lists = token_lists if token_lists is not None else [self.analyzer(text) for text in texts]
+        with self._lock:
+            number = self._next_segment
+            self._next_segment += 1
+            # re-added ids hide their postings in older segments
+            for chunk_id in ids:
+                if chunk_id in self._live_ids:
+                    self.tombstones[chunk_id] = number
+
+            segment = _Segment.write(os.path.join(self.path, f"seg_{number:06d}"), ids, token_lists)
+            self.segments.append(segment)
+            self._docs += len(segment)
+            self._total_len += int(segment.doc_lens.sum())
+            self._live_ids.update(ids)
+
+            if len(self.segments) > self.max_segments:
+                self._merge()
+            self._save()
+
+    def remove(self, ids: Iterable[str]) -> None:
+        with self._lock:
+            for chunk_id in ids:
+                if chunk_id in self._live_ids:
+                    self.tombstones[chunk_id] = self._next_segment
+                    self._live_ids.discard(chunk_id)
+            self._save()
+
+    def _merge(self) -> None:
+        """Rewrite every segment but the largest as one, dropping dead docs"""
+        base = max(self.segments, key=len)
+        merging = [segment for segment in self.segments if segment is not base]
+
+        ids, token_lists = [], []
+        for segment in merging:
+            for row, chunk_id in enumerate(segment.ids):
+                if not self._is_dead(chunk_id, segment):
+                    ids.append(chunk_id)
+                    token_lists.append(segment.tokens(row))
+
+        number = self._next_segment
+        self._next_segment += 1
+        merged = _Segment.write(os.path.join(self.path, f"seg_{number:06d}"), ids, token_lists)
+        self.segments = [base, merged]
+        # only tombstones that still hide docs of the base segment are needed
+        base_ids = set(base.ids)
+        self.tombstones = {chunk_id: seq for chunk_id, seq in self.tombstones.items()
+                           if seq > self._number(base) and chunk_id in base_ids}
+        self._refresh_stats()
+        self.logger.info(f"Merged {len(merging)} BM25 segments into seg_{number:06d} ({len(ids)} docs)")
+
+    def rebuild(self, records: Iterable[Tuple[str, str]], batch_size: int = 5000) -> None:
+        """Drop everything and index ``(chunk_id, text)`` pairs from scratch"""
+        with self._lock:
+            self.segments, self.tombstones = [], {}
+            self._refresh_stats()
+            self._save()
+            batch: List[Tuple[str, str]] = []
+            for record in records:
+                batch.append(record)
+                if len(batch) >= batch_size:
+                    self.add([i for i, _ in batch], [t for _, t in batch])
+                    batch = []
+            self.add([i for i, _ in batch], [t for _, t in batch])
+
+    # ------------------------------------------------------------------ search
+    def search(self, query: str, k: int = 5,
+               exclude: Optional[Set[str]] = None) -> Tuple[List[str], np.ndarray]:
+        """Top-k chunk ids by BM25 and their scores"""
+        terms = set(self.analyzer(query))
+        exclude = exclude or set()
+        with self._lock:
+            segments, docs, total_len = list(self.segments), self._docs, self._total_len
+        if not terms or not docs:
+            return [], np.zeros(0, dtype=np.float32)
+        avgdl = total_len / docs
+
+        per_segment = {term: [segment.term_postings(term) for segment in segments] for term in terms}
+        candidate_ids: List[str] = []
+        candidate_scores: List[np.ndarray] = []
+
+        for s, segment in enumerate(segments):
+            rows_parts, score_parts = [], []
+            for term, postings in per_segment.items():
+                rows, tfs = postings[s]
+                if not len(rows):
+                    continue
+                df = sum(len(p[0]) for p in postings)
+                idf = math.log(1.0 + (docs - df + 0.5) / (df + 0.5))
+                tfs = tfs.astype(np.float32)
+                norm = self.k1 * (1.0 - self.b + self.b * segment.doc_lens[rows] / avgdl)
+                rows_parts.append(np.asarray(rows))
+                score_parts.append(idf * tfs * (self.k1 + 1.0) / (tfs + norm))
+            if not rows_parts:
+                continue
+
+            # sum the contributions of every term per doc, over touched postings only
+            rows, inverse = np.unique(np.concatenate(rows_parts), return_inverse=True)
+            scores = np.bincount(inverse, weights=np.concatenate(score_parts)).astype(np.float32)
+            keep = [i for i, row in enumerate(rows.tolist())
+                    if segment.ids[row] not in exclude and not self._is_dead(segment.ids[row], segment)]
+            candidate_ids.extend(segment.ids[rows[i]] for i in keep)
+            candidate_scores.append(scores[keep])
+
+        if not candidate_ids:
+            return [], np.zeros(0, dtype=np.float32)
+        scores = np.concatenate(candidate_scores)
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [candidate_ids[i] for i in top], scores[top]
+
+    def tokens(self, chunk_id: str) -> List[str]:
+        """Stored token stream of a live chunk (empty if it is not indexed)"""
+        for segment in reversed(self.segments):
+            if chunk_id in segment.ids and not self._is_dead(chunk_id, segment):
+                return segment.tokens(segment.ids.index(chunk_id))
+        return []
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "analyzer": self.analyzer_name,
+            "docs": len(self),
+            "segments": len(self.segments),
+            "tombstones": len(self.tombstones),
+            "terms": sum(len(segment.terms) for segment in self.segments),
+            "postings": sum(len(segment.postings) for segment in self.segments),
+        }
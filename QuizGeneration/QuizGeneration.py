@@ -1,4 +1,4 @@
-from typing import Tuple, List, Dict, Any
+from typing import Tuple, List, Dict, Any, Optional
 from LLMProvider.LLMProvider import *
 from PromptManager.PromptManager import *
 from QueryClassification.QueryDocumentProcessor import *
@@ -18,8 +18,9 @@ class QuizGeneration:
         ## ADD ANY 
         return re.sub(r'[^\u0600-\u06FF\s]', '', text)
 
-    def generate_quiz(self, query: str) -> Dict[str, Any]:
-        retrieval_result = self.retriever.retrieve_documents(query, 10)
+    def generate_quiz(self, query: str, filter: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        # ``filter`` scopes the quiz to e.g. one book / page range (ChromaDBManager.build_filter)
+        retrieval_result = self.retriever.retrieve_documents(query, 10, filter=filter)
         formatted_documents = self.retriever.format_documents(retrieval_result)
         all_questions = []
         all_options = []
@@ -0,0 +1,121 @@
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional
+import logging
+import re
+import time
+
+import numpy as np
+from langchain.schema import Document
+from langchain.retrievers.document_compressors import LLMChainExtractor
+
+from Enums import CompressionMode
+from LLMProvider.LLMProvider import LLMProvider
+
+
+_SENTENCE_END = re.compile(r"(?<=[.!?؟؛])\s+|\n+")
+
+
+class ContextCompressor:
+    """
+    Shrinks retrieved chunks to the parts relevant to the query.
+
+    ``LLM`` mode runs LangChain's LLMChainExtractor once per document, with at
+    most ``max_concurrency`` calls in flight; documents whose call misses
+    ``deadline`` fall back to extractive compression. ``EXTRACTIVE`` mode
+    needs no LLM: every chunk's sentences are embedded in one batch (through
+    the embedding cache) and the ``max_sentences`` closest to the query are
+    kept, in their original order.
+    """
+
+    def __init__(self, mode: CompressionMode = CompressionMode.LLM,
+                 llm_provider: Optional[LLMProvider] = None, embedding_provider=None,
+                 max_concurrency: int = 4, deadline: float = 15.0, max_sentences: int = 3):
+        if mode == CompressionMode.LLM and llm_provider is None:
+            raise ValueError("LLM compression needs an llm_provider")
+        if embedding_provider is None and mode == CompressionMode.EXTRACTIVE:
+            raise ValueError("Extractive compression needs an embedding_provider")
+        self.mode = mode
+        self.embedding_provider = embedding_provider
+        self.max_sentences = max_sentences
+        self.deadline = deadline
+        self.extractor = LLMChainExtractor.from_llm(llm_provider.get_llm()) if llm_provider is not None else None
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="context-compressor")
+        self.logger = logging.getLogger(__name__)
+        self.last_stats: Dict[str, Any] = {}
+
+    def compress(self, query: str, documents: List[Document]) -> List[Document]:
+        start = time.perf_counter()
+        if self.mode == CompressionMode.EXTRACTIVE:
+            compressed = self.extract(query, documents)
+            timed_out = 0
+        elif self.mode == CompressionMode.LLM:
+            compressed, timed_out = self._compress_llm(query, documents)
+        else:
+            raise ValueError(f"Unsupported compression mode: {self.mode}")
+
+        self.last_stats = {
+            "mode": self.mode.value,
+            "documents": len(documents),
+            "kept": len(compressed),
+            "timed_out": timed_out,
+            "chars_in": sum(len(doc.page_content) for doc in documents),
+            "chars_out": sum(len(doc.page_content) for doc in compressed),
+            "ms": (time.perf_counter() - start) * 1000,
+        }
+        return compressed
+
+    def _compress_llm(self, query: str, documents: List[Document]):
+        futures = [self._executor.submit(self.extractor.compress_documents, [doc], query) for doc in documents]
+        done, not_done = wait(futures, timeout=self.deadline)
+        for future in not_done:
+            future.cancel()
+
+        # one slot per input document, so the output keeps the ranked order
+        slots: List[List[Document]] = [[] for _ in documents]
+        late = []
+        for position, (doc, future) in enumerate(zip(documents, futures)):
+            if future in done and future.exception() is None:
+                # An empty result means the extractor found nothing relevant
+                slots[position] = future.result()
+            else:
+                if future in done:
+                    self.logger.warning(f"Context extraction failed: {future.exception()}")
+                late.append(position)
+
+        if late:
+            self.logger.warning(f"{len(late)} of {len(documents)} extractions missed the "
+                                f"{self.deadline}s deadline or failed; using extractive compression")
+            late_docs = [documents[position] for position in late]
+            fallback = self.extract(query, late_docs) if self.embedding_provider is not None else late_docs
+            # extract returns one document per input, in order
+            for position, doc in zip(late, fallback):
+                slots[position] = [doc]
+        return [doc for slot in slots for doc in slot], len(late)
+
+    @staticmethod
+    def split_sentences(text: str) -> List[str]:
+        return [sentence.strip() for sentence in _SENTENCE_END.split(text) if sentence.strip()]
+
+    def extract(self, query: str, documents: List[Document]) -> List[Document]:
+        """Keep each document's ``max_sentences`` sentences most similar to the query"""
+        sentences = [self.split_sentences(doc.page_content) for doc in documents]
+        flat = [sentence for doc_sentences in sentences for sentence in doc_sentences]
+        if not flat:
+            return documents
+
+        vectors = self.embedding_provider.embed_array(flat)
+        query_vector = self.embedding_provider.embed_query_array(query)
+        vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        scores = vectors @ (query_vector / max(float(np.linalg.norm(query_vector)), 1e-12))
+
+        compressed, offset = [], 0
+        for doc, doc_sentences in zip(documents, sentences):
+            doc_scores = scores[offset:offset + len(doc_sentences)]
+            offset += len(doc_sentences)
+            if len(doc_sentences) <= self.max_sentences:
+                compressed.append(doc)
+                continue
+            keep = np.sort(np.argsort(-doc_scores)[:self.max_sentences])
+            compressed.append(Document(page_content=" ".join(doc_sentences[i] for i in keep),
+                                       metadata=dict(doc.metadata or {})))
+        return compressed
@@ -0,0 +1,121 @@
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+import time
+
+import numpy as np
+from langchain.schema import Document
+
+from Enums import ScoreNormalization
+from VectorDB.ChromaDBManager import ChromaDBManager
+
+
+class FederatedRetriever:
+    """
+    Searches several collections in parallel and merges them into one top-k.
+
+    The query is embedded once per distinct embedding provider (once in
+    total when every collection shares the process-wide provider) and each
+    collection is searched by vector on a thread pool. Collections that miss
+    ``timeout`` are left out of that answer instead of stalling it.
+
+    Every returned document is a copy whose metadata carries its provenance:
+    ``collection``, ``chunk_id``, ``score`` (after normalization) and ``raw_score``.
+    """
+
+    def __init__(self, sources: Dict[str, ChromaDBManager], timeout: float = 2.0,
+                 normalization: Optional[ScoreNormalization] = None,
+                 max_workers: Optional[int] = None):
+        """
+        :param sources: collection label -> manager
+        :param timeout: seconds to wait for the collections, which all run at once
+        :param normalization: per-collection score normalization. ``None`` keeps raw
+                              cosine scores when all collections share one embedding
+                              model (they are directly comparable) and uses min-max otherwise.
+        """
+        self.sources = sources
+        self.timeout = timeout
+        self.normalization = normalization
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or 2 * len(sources),
+                                            thread_name_prefix="federated-search")
+        self.logger = logging.getLogger(__name__)
+        self.last_stats: Dict[str, Any] = {}
+
+    def _normalization(self) -> ScoreNormalization:
+        if self.normalization is not None:
+            return self.normalization
+        providers = {id(manager.embedding_provider) for manager in self.sources.values()}
+        return ScoreNormalization.NONE if len(providers) == 1 else ScoreNormalization.MIN_MAX
+
+    @staticmethod
+    def normalize(scores: np.ndarray, method: ScoreNormalization) -> np.ndarray:
+        scores = np.asarray(scores, dtype=np.float32)
+        if method == ScoreNormalization.NONE or len(scores) == 0:
+            return scores
+        if method == ScoreNormalization.MIN_MAX:
+            spread = scores.max() - scores.min()
+            return (scores - scores.min()) / spread if spread > 0 else np.ones_like(scores)
+        if method == ScoreNormalization.Z_SCORE:
+            std = scores.std()
+            return (scores - scores.mean()) / std if std > 0 else np.zeros_like(scores)
+        raise ValueError(f"Unsupported score normalization: {method}")
+
+    def _embed_query(self, query: str) -> Dict[int, np.ndarray]:
+        """Query vector per distinct embedding provider"""
+        vectors: Dict[int, np.ndarray] = {}
+        for manager in self.sources.values():
+            provider = manager.embedding_provider
+            if id(provider) not in vectors:
+                vectors[id(provider)] = provider.embed_query_array(query)
+        return vectors
+
+    def _search_one(self, manager: ChromaDBManager, query_vector: np.ndarray, k: int,
+                    filter: Optional[Dict[str, Any]]) -> Tuple[List[str], np.ndarray, List[Document], float]:
+        start = time.perf_counter()
+        ids, scores, docs = manager.search_by_vector(query_vector, k, filter=filter)
+        return ids, scores, docs, (time.perf_counter() - start) * 1000
+
+    def search(self, query: str, k: int = 5,
+               filter: Optional[Dict[str, Any]] = None) -> List[Document]:
+        """Merged top-k over every collection that answered in time"""
+        query_vectors = self._embed_query(query)
+        futures = {
+            self._executor.submit(self._search_one, manager,
+                                  query_vectors[id(manager.embedding_provider)], k, filter): name
+            for name, manager in self.sources.items()
+        }
+        done, not_done = wait(futures, timeout=self.timeout)
+        for future in not_done:
+            future.cancel()
+
+        method = self._normalization()
+        best: Dict[str, Tuple[float, Document]] = {}
+        stats: Dict[str, Any] = {"timed_out": [futures[f] for f in not_done], "failed": {}, "latency_ms": {}}
+
+        for future in done:
+            name = futures[future]
+            try:
+                ids, scores, docs, latency_ms = future.result()
+            except Exception as e:
+                self.logger.warning(f"Federated search failed on {name}: {e}")
+                stats["failed"][name] = str(e)
+                continue
+            stats["latency_ms"][name] = latency_ms
+
+            for chunk_id, raw, score, doc in zip(ids, scores, self.normalize(scores, method), docs):
+                # Same content-addressed chunk in several collections: keep the best hit
+                if chunk_id in best and best[chunk_id][0] >= score:
+                    continue
+                metadata = dict(doc.metadata or {})
+                metadata.update(collection=name, chunk_id=chunk_id, score=float(score), raw_score=float(raw))
+                best[chunk_id] = (float(score), Document(page_content=doc.page_content, metadata=metadata))
+
+        if stats["timed_out"]:
+            self.logger.warning(f"Federated search timed out on {stats['timed_out']} after {self.timeout}s")
+        self.last_stats = stats
+
+        ranked = sorted(best.values(), key=lambda item: item[0], reverse=True)
+        return [doc for _, doc in ranked[:k]]
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,98 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+import time
+
+import numpy as np
+from langchain.schema import Document
+
+from Enums import FusionMethod
+from VectorDB.ChromaDBManager import ChromaDBManager
+
+
+Leg = Tuple[List[str], np.ndarray, List[Document]]
+
+
+class HybridRetriever:
+    """
+    Dense + BM25 retrieval with the two legs run concurrently and fused in NumPy.
+
+    Fusion is either weighted reciprocal rank (``w / (rrf_c + rank)``) or a
+    weighted sum of min-max normalized scores. Hits are keyed by chunk id, so
+    a chunk found by both legs is one result with both contributions.
+    """
+
+    def __init__(self, db_manager: ChromaDBManager,
+                 fusion: FusionMethod = FusionMethod.RECIPROCAL_RANK,
+                 dense_k: Optional[int] = None, lexical_k: Optional[int] = None,
+                 dense_weight: float = 0.5, lexical_weight: float = 0.5,
+                 rrf_c: int = 60):
+        """
+        :param dense_k / lexical_k: candidates fetched per leg (default: the requested k)
+        """
+        self.db_manager = db_manager
+        self.fusion = fusion
+        self.dense_k = dense_k
+        self.lexical_k = lexical_k
+        self.weights = np.array([dense_weight, lexical_weight], dtype=np.float32)
+        self.rrf_c = rrf_c
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="hybrid-leg")
+        self.logger = logging.getLogger(__name__)
+        self.last_stats: Dict[str, float] = {}
+
+    @staticmethod
+    def _timed(fn, *args, **kwargs) -> Tuple[Any, float]:
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        return result, (time.perf_counter() - start) * 1000
+
+    def _dense(self, query: str, k: int, filter: Optional[Dict[str, Any]]) -> Leg:
+        query_vector = self.db_manager.embedding_provider.embed_query_array(query)
+        return self.db_manager.search_by_vector(query_vector, k, filter=filter)
+
+    def _leg_scores(self, scores: np.ndarray) -> np.ndarray:
+        """Per-hit contribution of one leg before weighting"""
+        if self.fusion == FusionMethod.RECIPROCAL_RANK:
+            return 1.0 / (self.rrf_c + np.arange(1, len(scores) + 1, dtype=np.float32))
+        if self.fusion == FusionMethod.NORMALIZED_SCORE:
+            scores = np.asarray(scores, dtype=np.float32)
+            if not len(scores):
+                return scores
+            spread = scores.max() - scores.min()
+            return (scores - scores.min()) / spread if spread > 0 else np.ones_like(scores)
+        raise ValueError(f"Unsupported fusion method: {self.fusion}")
+
+    def fuse(self, legs: List[Leg], k: int) -> List[Tuple[str, float, Document]]:
+        """Fused top-k (chunk id, score, document) over the legs' hits"""
+        ids = [chunk_id for leg_ids, _, _ in legs for chunk_id in leg_ids]
+        if not ids:
+            return []
+        contributions = np.concatenate([
+            weight * self._leg_scores(scores) for weight, (_, scores, _) in zip(self.weights, legs)
+        ])
+        unique_ids, inverse = np.unique(np.array(ids, dtype=object), return_inverse=True)
+        fused = np.bincount(inverse, weights=contributions)
+
+        top = np.argsort(-fused, kind="stable")[:k]
+        docs = {chunk_id: doc for leg_ids, _, leg_docs in legs for chunk_id, doc in zip(leg_ids, leg_docs)}
+        return [(unique_ids[i], float(fused[i]), docs[unique_ids[i]]) for i in top]
+
+    def search(self, query: str, k: int = 5,
+               filter: Optional[Dict[str, Any]] = None) -> List[Document]:
+        start = time.perf_counter()
+        dense = self._executor.submit(self._timed, self._dense, query, self.dense_k or k, filter)
+        lexical = self._executor.submit(self._timed, self.db_manager.lexical_search_with_scores,
+                                        query, self.lexical_k or k, filter=filter)
+        (dense_leg, dense_ms), (lexical_leg, lexical_ms) = dense.result(), lexical.result()
+        fused = self.fuse([dense_leg, lexical_leg], k)
+
+        self.last_stats = {
+            "dense_ms": dense_ms,
+            "lexical_ms": lexical_ms,
+            "total_ms": (time.perf_counter() - start) * 1000,
+            "overlap": len(set(dense_leg[0]) & set(lexical_leg[0])),
+        }
+        return [doc for _, _, doc in fused]
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
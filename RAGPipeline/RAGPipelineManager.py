@@ -1,13 +1,19 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import logging
+import time
 from langchain.schema import Document
 
-from Enums import RetrievalMethod
+from Enums import RetrievalMethod, VectorQuantization, VectorBackend, LexicalAnalyzer, FusionMethod, CompressionMode
 from LLMProvider.LLMProvider import LLMProvider
 from QueryTransformer.QueryTransformer import QueryTransformer
 from PromptManager.PromptManager import PromptManager
 from VectorDB.ChromaDBManager import ChromaDBManager
 from RAGPipeline.RetrieveMethods import RetrieveMethods
+from RAGPipeline.FederatedRetriever import FederatedRetriever
+from RAGPipeline.HybridRetriever import HybridRetriever
+from RAGPipeline.ContextCompressor import ContextCompressor
+from RAGPipeline.RetrievalCache import RetrievalCache
+from Reranker.Reranker import Reranker
 from QueryClassification.QueryDocumentProcessor import QueryDocumentProcessor
 from HallucinationsCheck.HallucinationsCheck import HallucinationsCheck
 from Generation.RAGGenerationPipeline import RAGGenerationPipeline
@@ -29,6 +35,20 @@ class RAGPipelineManager:
         k: int = 2,
         fetch_k: int = 7,
         retrieve_method: RetrievalMethod = RetrievalMethod.MAX_MARGINAL_RELEVANCE,
+        quantization: Optional[VectorQuantization] = None,
+        vector_backend: VectorBackend = VectorBackend.CHROMA,
+        lexical_analyzer: LexicalAnalyzer = LexicalAnalyzer.ARABIC,
+        hybrid_fusion: FusionMethod = FusionMethod.RECIPROCAL_RANK,
+        hybrid_weights: Tuple[float, float] = (0.5, 0.5),
+        hybrid_k: Tuple[Optional[int], Optional[int]] = (None, None),
+        reranker: Optional[Reranker] = None,
+        rerank_fetch_k: int = 20,
+        compression_mode: CompressionMode = CompressionMode.LLM,
+        compression_concurrency: int = 4,
+        compression_deadline: float = 15.0,
+        federated_sources: Optional[List[Tuple[str, str]]] = None,
+        federated_timeout: float = 2.0,
+        retrieval_cache_size: int = 2048,
     ):
         logging.basicConfig(level=logging.INFO)
         self.logger = logging.getLogger(__name__)
@@ -38,6 +58,9 @@ class RAGPipelineManager:
             path=db_path,
             collection_name=collection_name,
             model_name=model_name,
+            quantization=quantization,
+            backend=vector_backend,
+            lexical_analyzer=lexical_analyzer,
         )
         self.llm_provider = llm_provider
         self.query_transformer = query_transformer
@@ -50,8 +73,46 @@ class RAGPipelineManager:
         self.fetch_k = fetch_k
         self.retrieve_method = retrieve_method
 
+        # Optional cross-encoder stage: over-fetch rerank_fetch_k, keep the top k
+        self.reranker = reranker
+        self.rerank_fetch_k = rerank_fetch_k
+        self.last_retrieval_stats: Dict[str, Any] = {}
+
+        # Repeated queries are served from chunk ids cached per collection write
+        # generation (0 disables); contextual and federated results are not cached
+        self.retrieval_cache = RetrievalCache(retrieval_cache_size) if retrieval_cache_size > 0 else None
+
+        # Extra (db_path, collection_name) pairs searched together with this collection
+        # by RetrievalMethod.FEDERATED; opened on first use
+        self.collection_name = collection_name
+        self.federated_sources = federated_sources or []
+        self.federated_timeout = federated_timeout
+        self._quantization = quantization
+        self._vector_backend = vector_backend
+        self._lexical_analyzer = lexical_analyzer
+        self._federated: Optional[FederatedRetriever] = None
+
         # Subsystems
-        self.retriever = RetrieveMethods(self.db_manager.vector_store)
+        # dense + BM25 legs in parallel; (dense, lexical) weights and per-leg k
+        self.hybrid_retriever = HybridRetriever(
+            self.db_manager,
+            fusion=hybrid_fusion,
+            dense_k=hybrid_k[0],
+            lexical_k=hybrid_k[1],
+            dense_weight=hybrid_weights[0],
+            lexical_weight=hybrid_weights[1],
+        ) if self.db_manager.bm25_path is not None else None
+        # ContextualRAG: concurrent LLM extraction with a deadline, or local extractive compression
+        self.context_compressor = ContextCompressor(
+            mode=compression_mode,
+            llm_provider=self.llm_provider,
+            embedding_provider=self.db_manager.embedding_provider,
+            max_concurrency=compression_concurrency,
+            deadline=compression_deadline,
+        ) if compression_mode == CompressionMode.EXTRACTIVE or self.llm_provider is not None else None
+        self.retriever = RetrieveMethods(self.db_manager.vector_store, db_manager=self.db_manager,
+                                         hybrid_retriever=self.hybrid_retriever,
+                                         context_compressor=self.context_compressor)
         self.generation_pipeline = RAGGenerationPipeline(
             pipeline_manager=self,
             llm_provider=self.llm_provider,
@@ -67,11 +128,80 @@ class RAGPipelineManager:
         self.db_manager.add_documents(documents)
         self.logger.info(f"Stored {len(documents)} documents successfully.")
 
+    @property
+    def federated(self) -> FederatedRetriever:
+        if self._federated is None:
+            sources = {self.collection_name: self.db_manager}
+            for path, collection in self.federated_sources:
+                name = collection if collection not in sources else f"{path}:{collection}"
+                sources[name] = ChromaDBManager(
+                    path=path,
+                    collection_name=collection,
+                    embedding_provider=self.db_manager.embedding_provider,
+                    quantization=self._quantization,
+                    backend=self._vector_backend,
+                    lexical_analyzer=self._lexical_analyzer,
+                )
+            self._federated = FederatedRetriever(sources, timeout=self.federated_timeout)
+        return self._federated
+
+    def _retrieve(self, query: str, k: int, method: RetrievalMethod,
+                  filter: Optional[Dict[str, Any]], fetch_k: Optional[int] = None) -> List[Document]:
+        if method == RetrievalMethod.MAX_MARGINAL_RELEVANCE:
+            return self.retriever.max_marginal_relevance_search(query, k, fetch_k or max(self.fetch_k, k),
+                                                                filter=filter)
+
+        if method == RetrievalMethod.SIMILARITY_SEARCH:
+            return self.retriever.similarity_search(query, k, filter=filter)
+
+        if method == RetrievalMethod.HYBRID:
+            return self.retriever.HybridRAG(query, k, filter=filter)
+
+        if method == RetrievalMethod.CONTEXTUAL:
+            return self.retriever.ContextualRAG(llm_provider=self.llm_provider, query=query, k=k, filter=filter)
+
+        if method == RetrievalMethod.FEDERATED:
+            return self.federated.search(query, k, filter=filter)
+
+        raise ValueError(f"Unsupported retrieval method: {method}")
+
+    _CACHEABLE_METHODS = (
+        RetrievalMethod.MAX_MARGINAL_RELEVANCE,
+        RetrievalMethod.SIMILARITY_SEARCH,
+        RetrievalMethod.HYBRID,
+    )
+
+    @staticmethod
+    def _chunk_ids(documents: List[Document]) -> Optional[List[str]]:
+        """Store ids of retrieved documents, or None if any of them came back without one"""
+        chunk_ids = [(doc.metadata or {}).get("chunk_id") for doc in documents]
+        return None if None in chunk_ids else chunk_ids
+
+    def _from_cache(self, key: Tuple) -> Optional[List[Document]]:
+        """Documents of a cached result, or None if it is not cached (or no longer resolvable)"""
+        start = time.perf_counter()
+        entry = self.retrieval_cache.get(key)
+        if entry is not None:
+            documents = self.db_manager.backend.get_documents(entry.ids)
+            # a chunk deleted since (by a write that did not go through this process) is a miss
+            if len(documents) == len(entry.ids):
+                if entry.scores is not None:
+                    documents = [Document(page_content=doc.page_content,
+                                          metadata={**doc.metadata, "rerank_score": score})
+                                 for doc, score in zip(documents, entry.scores)]
+                self.retrieval_cache.record_hit(entry.cost_ms - (time.perf_counter() - start) * 1000)
+                return documents
+            self.retrieval_cache.discard(key)
+        self.retrieval_cache.record_miss()
+        return None
+
     def query_similar_documents(
         self,
         query: str,
         k: Optional[int] = None,
-        method: Optional[RetrievalMethod] = None
+        method: Optional[RetrievalMethod] = None,
+        filter: Optional[Dict[str, Any]] = None,
+        rerank: Optional[bool] = None,
     ) -> List[Document]:
         """
         Retrieve similar documents based on the selected retrieval strategy.
@@ -79,26 +209,71 @@ class RAGPipelineManager:
         :param query: the user’s query
         :param k: override the top-k count (defaults to self.k)
         :param method: override the retrieval method (defaults to self.retrieve_method)
+        :param filter: Chroma ``where`` filter on chunk metadata, pushed down to the
+                       vector store (see ChromaDBManager.build_filter)
+        :param rerank: over-fetch ``rerank_fetch_k`` candidates and keep the cross-encoder's
+                       top k (defaults to True when a reranker is configured)
         """
         k = k or self.k
         method = method or self.retrieve_method
+        rerank = self.reranker is not None if rerank is None else rerank
+        if rerank and self.reranker is None:
+            raise ValueError("RAGPipelineManager was created without a reranker")
 
 
-        self.logger.info(f"Retrieving documents using {method.value} (k={k}) for query: {query}")
+        self.logger.info(f"Retrieving documents using {method.value} (k={k}, filter={filter}, "
+                         f"rerank={rerank}) for query: {query}")
 
-        if method == RetrievalMethod.MAX_MARGINAL_RELEVANCE:
-            return self.retriever.max_marginal_relevance_search(query, k, self.fetch_k)
+        # with reranking, MMR diversifies a pool larger than the reranker's candidates,
+        # otherwise it would pick all n of n and not diversify at all
+        n = max(k, self.rerank_fetch_k) if rerank else k
+        fetch_k = max(self.fetch_k, 2 * n) if rerank else max(self.fetch_k, k)
 
-        if method == RetrievalMethod.SIMILARITY_SEARCH:
-            return self.retriever.similarity_search(query, k)
+        cache_key = None
+        if self.retrieval_cache is not None and method in self._CACHEABLE_METHODS:
+            # generation is read before retrieving, so a write during the search cannot be masked
+            cache_key = RetrievalCache.make_key(self.db_manager.generation, query, method.value, k,
+                                                fetch_k, filter, self.rerank_fetch_k if rerank else None)
+            start = time.perf_counter()
+            documents = self._from_cache(cache_key)
+            if documents is not None:
+                self.last_retrieval_stats = {
+                    "method": method.value,
+                    "k": k,
+                    "cache_hit": True,
+                    "retrieval_ms": (time.perf_counter() - start) * 1000,
+                }
+                return documents
 
-        if method == RetrievalMethod.HYBRID:
-            return self.retriever.HybridRAG(query, k)
+        start = time.perf_counter()
+        documents = self._retrieve(query, n, method, filter, fetch_k=fetch_k)
+        retrieval_ms = (time.perf_counter() - start) * 1000
+        candidates = len(documents)
 
-        if method == RetrievalMethod.CONTEXTUAL:
-            return self.retriever.ContextualRAG(llm_provider=self.llm_provider, query=query)
+        rerank_ms = 0.0
+        if rerank:
+            start = time.perf_counter()
+            # store ids, so cached scores survive across methods
+            chunk_ids = self._chunk_ids(documents) or [ChromaDBManager.make_chunk_id(doc) for doc in documents]
+            documents = self.reranker.rerank(query, documents, k, chunk_ids=chunk_ids)
+            rerank_ms = (time.perf_counter() - start) * 1000
+            self.logger.info(f"Reranked {candidates} candidates to {len(documents)} "
+                             f"(retrieval {retrieval_ms:.1f} ms + rerank {rerank_ms:.1f} ms)")
 
-        raise ValueError(f"Unsupported retrieval method: {method}")
+        chunk_ids = self._chunk_ids(documents) if cache_key is not None else None
+        if chunk_ids is not None:
+            scores = [doc.metadata["rerank_score"] for doc in documents] if rerank else None
+            self.retrieval_cache.put(cache_key, chunk_ids, scores, retrieval_ms + rerank_ms)
+
+        self.last_retrieval_stats = {
+            "method": method.value,
+            "k": k,
+            "cache_hit": False,
+            "candidates": candidates,
+            "retrieval_ms": retrieval_ms,
+            "rerank_ms": rerank_ms,
+        }
+        return documents
 
     def generate_answer(self, query: str) -> Dict[str, Any]:
         """
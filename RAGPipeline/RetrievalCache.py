@@ -0,0 +1,95 @@
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+import json
+import threading
+
+
+class CachedRetrieval(NamedTuple):
+    ids: List[str]
+    scores: Optional[List[float]]  # rerank scores, when the result was reranked
+    cost_ms: float                 # what computing the result took
+
+
+class RetrievalCache:
+    """
+    Bounded LRU of retrieval results of one collection.
+
+    Entries hold chunk ids (and rerank scores), not documents; callers resolve
+    them from the store. Keys start with the collection's write generation
+    (ChromaDBManager.generation), so a write makes every older entry
+    unreachable; they are dropped as soon as a newer generation is seen.
+    """
+
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, CachedRetrieval]" = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "invalidations": 0, "saved_ms": 0.0}
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        return " ".join(query.split()).casefold()
+
+    @classmethod
+    def make_key(cls, generation: int, query: str, method: str, k: int, fetch_k: int,
+                 filter: Optional[Dict[str, Any]] = None, rerank_fetch_k: Optional[int] = None) -> Tuple:
+        filter_key = json.dumps(filter, sort_keys=True, ensure_ascii=False) if filter else ""
+        return (generation, cls.normalize_query(query), method, k, fetch_k, filter_key, rerank_fetch_k)
+
+    def _check_generation(self, generation: int) -> None:
+        # caller holds the lock
+        if generation > self._generation:
+            if self._entries:
+                self._stats["invalidations"] += 1
+            self._entries.clear()
+            self._generation = generation
+
+    def get(self, key: Tuple) -> Optional[CachedRetrieval]:
+        """The cached result for ``key``; hits and misses are counted by the caller"""
+        with self._lock:
+            self._check_generation(key[0])
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: Tuple, ids: List[str], scores: Optional[List[float]], cost_ms: float) -> None:
+        with self._lock:
+            self._check_generation(key[0])
+            if key[0] < self._generation:
+                return  # computed before a write finished
+            self._entries[key] = CachedRetrieval(list(ids), scores, cost_ms)
+            self._entries.move_to_end(key)
+            self._stats["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, key: Tuple) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def record_hit(self, saved_ms: float) -> None:
+        with self._lock:
+            self._stats["hits"] += 1
+            self._stats["saved_ms"] += max(saved_ms, 0.0)
+
+    def record_miss(self) -> None:
+        with self._lock:
+            self._stats["misses"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit rate and retrieval time saved by serving cached results"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["generation"] = self._generation
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["saved_ms_per_hit"] = stats["saved_ms"] / stats["hits"] if stats["hits"] else 0.0
+        stats["max_entries"] = self.max_entries
+        return stats
@@ -1,31 +1,49 @@
-from typing import  List ,Optional
+from typing import  List ,Optional, Dict, Any
 from langchain_community.vectorstores import Chroma
 from langchain.schema import Document
 from langchain_community.retrievers import BM25Retriever
 from langchain.retrievers import EnsembleRetriever
-from langchain.retrievers import ContextualCompressionRetriever
-from langchain.retrievers.document_compressors import LLMChainExtractor
 from LLMProvider.LLMProvider import *
+from RAGPipeline.ContextCompressor import ContextCompressor
 
 class RetrieveMethods:
-    def __init__(self, vector_store: Chroma):
+    def __init__(self, vector_store: Chroma, db_manager=None, hybrid_retriever=None,
+                 context_compressor: Optional[ContextCompressor] = None):
 
         self.vector_store = vector_store
-        self._all_documents = self.vector_store.get()["documents"]
-
-
-    def similarity_search(self, query: str, k: int = 2) -> List[Document]:
-        return self.vector_store.similarity_search(query, k)
-
-    def max_marginal_relevance_search(self, query: str, k: int = 2, fetch_k: int = 12) -> List[Document]:
-        return self.vector_store.max_marginal_relevance_search(query, k, fetch_k)
+        # When given, dense searches go through the manager (e.g. its quantized index)
+        self.db_manager = db_manager
+        # Native dense + BM25 retriever (RAGPipeline.HybridRetriever), used by HybridRAG when given
+        self.hybrid_retriever = hybrid_retriever
+        # Compression used by ContextualRAG; built from the call's llm_provider when not given
+        self.context_compressor = context_compressor
+
+
+    def similarity_search(self, query: str, k: int = 2, filter: Optional[Dict[str, Any]] = None) -> List[Document]:
+        if self.db_manager is not None:
+            return self.db_manager.similarity_search(query, k, filter=filter)
+        return self.vector_store.similarity_search(query, k, filter=filter)
+
+    def max_marginal_relevance_search(self, query: str, k: int = 2, fetch_k: int = 12,
+                                      filter: Optional[Dict[str, Any]] = None) -> List[Document]:
+        if self.db_manager is not None:
+            return self.db_manager.max_marginal_relevance_search(query, k, fetch_k, filter=filter)
+        return self.vector_store.max_marginal_relevance_search(query, k, fetch_k, filter=filter)
+
+    def _search_kwargs(self, filter: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        return {"filter": filter} if filter else {}
     
-    def HybridRAG(self, query: str, k: int = 2) -> List[Document]:
-        vector_retriever = self.vector_store.as_retriever()
-
-        bm25_retriever = BM25Retriever.from_documents(
-            [Document(page_content=doc) for doc in self._all_documents]
-        )
+    def HybridRAG(self, query: str, k: int = 2, filter: Optional[Dict[str, Any]] = None) -> List[Document]:
+        if self.hybrid_retriever is not None:
+            return self.hybrid_retriever.search(query, k, filter=filter)
+
+        # No persistent lexical index: index the (filtered) corpus for this query only
+        vector_retriever = self.vector_store.as_retriever(search_kwargs=self._search_kwargs(filter))
+        if self.db_manager is not None:
+            corpus = self.db_manager.corpus.iter_documents(where=filter)
+        else:
+            corpus = (Document(page_content=doc) for doc in self.vector_store.get(where=filter)["documents"])
+        bm25_retriever = BM25Retriever.from_documents(corpus)
         bm25_retriever.k = k
 
         hybrid_retriever = EnsembleRetriever(retrievers=[vector_retriever, bm25_retriever], weights=[0.5, 0.5])
@@ -40,15 +58,17 @@ class RetrieveMethods:
         
         return unique_results[:k]
     
-    def ContextualRAG(self, query: str, k: int = 2,llm_provider: Optional[LLMProvider] = None) -> List[Document]:
-        compressor = LLMChainExtractor.from_llm(llm_provider.get_llm())
-
-        compression_retriever = ContextualCompressionRetriever(
-            base_compressor=compressor,
-            base_retriever=self.vector_store.as_retriever()
-        )
-
-        return compression_retriever.get_relevant_documents(query)
+    def ContextualRAG(self, query: str, k: int = 2,llm_provider: Optional[LLMProvider] = None,
+                      filter: Optional[Dict[str, Any]] = None) -> List[Document]:
+        compressor = self.context_compressor
+        if compressor is None:
+            compressor = self.context_compressor = ContextCompressor(
+                llm_provider=llm_provider,
+                embedding_provider=self.db_manager.embedding_provider if self.db_manager is not None else None,
+            )
+
+        documents = self.similarity_search(query, k, filter=filter)
+        return compressor.compress(query, documents)
     
     # def AgenticRAG(self,query:str ,top_k: int = 5)-> List[Document]:
     #     db_path = "D:\Graduation Project\Local\DB_FINAL"
@@ -0,0 +1,122 @@
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import hashlib
+import logging
+import threading
+import time
+
+import numpy as np
+from langchain.schema import Document
+from sentence_transformers import CrossEncoder
+
+
+class Reranker:
+    """
+    Cross-encoder reranking of retrieved candidates.
+
+    All uncached (query, chunk) pairs of a call are scored in one batched
+    ``predict`` pass. Scores are cached per (query, chunk id) in a bounded LRU,
+    so repeated or overlapping queries only score the chunks they have not
+    seen. The model is loaded on first use.
+    """
+
+    def __init__(self, model_name: str = "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1",
+                 device: str = "cpu", batch_size: int = 32, max_length: int = 512,
+                 cache_size: int = 50_000):
+        self.model_name = model_name
+        self.device = device
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.cache_size = cache_size
+
+        self._model: Optional[CrossEncoder] = None
+        self._cache: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._model_lock = threading.Lock()
+        self._latencies_ms: deque = deque(maxlen=1000)
+        self._stats = {"calls": 0, "pairs": 0, "scored": 0}
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def model(self) -> CrossEncoder:
+        with self._model_lock:
+            if self._model is None:
+                self.logger.info(f"Loading reranker {self.model_name} (device={self.device})")
+                self._model = CrossEncoder(self.model_name, device=self.device, max_length=self.max_length)
+        return self._model
+
+    @staticmethod
+    def _query_key(query: str) -> str:
+        return " ".join(query.split())
+
+    @staticmethod
+    def content_id(document: Document) -> str:
+        """Fallback chunk id when the caller has none"""
+        return hashlib.sha1(document.page_content.encode("utf-8")).hexdigest()
+
+    def score(self, query: str, texts: Sequence[str], chunk_ids: Sequence[str]) -> np.ndarray:
+        """Relevance score of every text for ``query``; cached pairs are not re-scored"""
+        query_key = self._query_key(query)
+        keys = [(query_key, chunk_id) for chunk_id in chunk_ids]
+        scores = np.empty(len(keys), dtype=np.float32)
+
+        missing = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                cached = self._cache.get(key)
+                if cached is None:
+                    missing.append(i)
+                else:
+                    self._cache.move_to_end(key)
+                    scores[i] = cached
+
+        if missing:
+            predicted = self.model.predict([(query, texts[i]) for i in missing],
+                                           batch_size=self.batch_size, show_progress_bar=False)
+            scores[missing] = np.asarray(predicted, dtype=np.float32)
+            with self._lock:
+                for i in missing:
+                    self._cache[keys[i]] = float(scores[i])
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        with self._lock:
+            self._stats["pairs"] += len(keys)
+            self._stats["scored"] += len(missing)
+        return scores
+
+    def rerank(self, query: str, documents: List[Document], k: int,
+               chunk_ids: Optional[Sequence[str]] = None) -> List[Document]:
+        """Top ``k`` documents by cross-encoder score; the score is added to their metadata"""
+        if not documents:
+            return []
+        start = time.perf_counter()
+        chunk_ids = chunk_ids or [self.content_id(doc) for doc in documents]
+        scores = self.score(query, [doc.page_content for doc in documents], chunk_ids)
+        top = np.argsort(-scores, kind="stable")[:k]
+
+        reranked = []
+        for i in top:
+            doc = documents[i]
+            reranked.append(Document(page_content=doc.page_content,
+                                     metadata={**(doc.metadata or {}), "rerank_score": float(scores[i])}))
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self._stats["calls"] += 1
+            self._latencies_ms.append(elapsed_ms)
+        return reranked
+
+    def stats(self) -> Dict[str, Any]:
+        """Calls, cache hit ratio and added latency (recent calls)"""
+        with self._lock:
+            latencies = np.asarray(self._latencies_ms, dtype=np.float64)
+            pairs, scored = self._stats["pairs"], self._stats["scored"]
+            return {
+                **self._stats,
+                "cached_pairs": len(self._cache),
+                "cache_hit_ratio": (pairs - scored) / pairs if pairs else 0.0,
+                "latency_ms_mean": float(latencies.mean()) if len(latencies) else 0.0,
+                "latency_ms_p50": float(np.percentile(latencies, 50)) if len(latencies) else 0.0,
+                "latency_ms_p95": float(np.percentile(latencies, 95)) if len(latencies) else 0.0,
+            }
@@ -1,10 +1,11 @@
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_community.document_loaders import PyPDFLoader
 from langchain.chains.summarize import load_summarize_chain
-from langchain_community.document_transformers import EmbeddingsClusteringFilter
 from langchain.prompts import PromptTemplate
 from typing import List, Dict, Optional, Any
 import os
+import numpy as np
+from sklearn.cluster import KMeans
 from Enums import SummaryStrategy
 
 from Embedding.EmbeddingProvider import EmbeddingProvider
@@ -175,13 +176,10 @@ class Summarizer:
         # Determine optimal number of clusters
         num_clusters = self.adaptive_clustering(texts)
         
-        # Apply clustering filter
-        filter = EmbeddingsClusteringFilter(
-            embeddings=self.embedding_provider,
-            num_clusters=num_clusters
-        )
-        
-        filtered_texts = filter.transform_documents(documents=texts)
+        # Cluster the float32 embedding matrix and keep the chunk closest to each centroid
+        embeddings = self.embedding_provider.embed_array([doc.page_content for doc in texts])
+        selected = self._select_cluster_representatives(embeddings, num_clusters)
+        filtered_texts = [texts[i] for i in selected]
         
         # Small check - if filtering fails or produces too few results, fall back to direct summarization
         if len(filtered_texts) < 2:
@@ -198,6 +196,34 @@ class Summarizer:
         summary = chain.invoke({"input_documents": filtered_texts})
         return summary["output_text"]
 
+    @staticmethod
+    def _select_cluster_representatives(embeddings: np.ndarray, num_clusters: int, random_state: int = 42) -> List[int]:
+        """
+        Pick the index of the chunk closest to each K-means centroid
+        (same selection as LangChain's EmbeddingsClusteringFilter).
+        
+        Args:
+            embeddings: float32 matrix with one row per chunk
+            num_clusters: Number of clusters to form
+            random_state: Seed for K-means
+            
+        Returns:
+            Indices of the selected chunks, in cluster order
+        """
+        num_clusters = min(num_clusters, len(embeddings))
+        kmeans = KMeans(n_clusters=num_clusters, random_state=random_state).fit(embeddings)
+        
+        # One (clusters x chunks) distance matrix instead of a loop per centroid
+        distances = np.linalg.norm(embeddings[None, :, :] - kmeans.cluster_centers_[:, None, :], axis=2)
+        
+        selected: List[int] = []
+        for row in distances:
+            for index in np.argsort(row):
+                if index not in selected:
+                    selected.append(int(index))
+                    break
+        return selected
+
     def save_summary(self, summary_text: str, output_path: str = "summary.txt"):
         """Save summary to a file"""
         with open(output_path, "w", encoding="utf-8") as f:
@@ -1,7 +1,7 @@
 from langchain.document_loaders import DirectoryLoader
 from langchain.schema import Document
 import re
-from typing import List
+from typing import Iterator, List
 import os
 
 from TextProcessor.TextProcessor import *
@@ -54,6 +54,9 @@ class ArabicBookProcessor:
                     book_name = os.path.splitext(file_name)[0]
 
                     new_metadata['source'] = f" اسم الكتاب : {book_name} - رقم الصفحه : {page_number}"
+                    # Plain fields for metadata filters (book scoping, numeric page ranges)
+                    new_metadata['book'] = book_name
+                    new_metadata['page'] = int(page_number)
 
                     page_doc = Document(
                         page_content=page.strip(),
@@ -75,4 +78,25 @@ class ArabicBookProcessor:
             chunk_overlap=chunk_overlap
         )
 
-        return final_documents
\ No newline at end of file
+        return final_documents
+
+    def iter_documents(self, chunk_size: int = 600, chunk_overlap: int = 200) -> Iterator[Document]:
+        """Same chunks as process_documents, produced one book at a time"""
+        loader = DirectoryLoader(
+            self.directory_path,
+            glob="*.txt",
+            show_progress=True
+        )
+
+        chunk_offset = 0
+        for document in loader.lazy_load():
+            chunks = self.text_processor.process_documents(
+                documents=self.split_by_pages([document]),
+                chunk_size=chunk_size,
+                chunk_overlap=chunk_overlap
+            )
+            # Keep chunk_id numbering continuous across books
+            for chunk in chunks:
+                chunk.metadata['chunk_id'] += chunk_offset
+                yield chunk
+            chunk_offset += len(chunks)
@@ -26,8 +26,8 @@ class UploadFile:
         )
 
     def upload(self):
-        processed_docs = self.processor.process_documents()
-        self.db_manager.add_documents(processed_docs)
+        # Stream book by book so memory doesn't grow with the corpus
+        self.db_manager.add_documents_stream(self.processor.iter_documents())
         print("NEW PATH", new_db_path)
         return new_db_path
 
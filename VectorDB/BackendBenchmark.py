@@ -0,0 +1,157 @@
+"""
+Head-to-head benchmark of the vector store backends on the same corpus.
+
+Every backend is built and queried in its own process so RSS numbers are not
+polluted by the others. The corpus is either an existing Chroma collection or
+random vectors.
+
+Usage:
+    python -m VectorDB.BackendBenchmark --db-path ./DB --collection Book --k 5
+    python -m VectorDB.BackendBenchmark --synthetic 100000 --dim 768
+"""
+from typing import Any, Dict, List, Optional, Tuple
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+
+BACKENDS = {
+    "chroma": {},
+    "inprocess-exact": {"hnsw_threshold": float("inf")},
+    "inprocess-hnsw": {"hnsw_threshold": 0},
+}
+
+
+def _rss_mb() -> float:
+    """Resident set size of the current process (Linux), in MB"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+    except (OSError, ValueError):
+        return float("nan")
+
+
+def _make_backend(name: str, work_dir: str):
+    if name == "chroma":
+        from VectorDB.VectorStoreBackend import ChromaBackend
+        return ChromaBackend("benchmark", work_dir, embedding_function=None)
+
+    from VectorDB.InProcessVectorStore import InProcessVectorStore
+    return InProcessVectorStore(os.path.join(work_dir, "store"), embedding=None, **BACKENDS[name])
+
+
+def _run_backend(name: str, corpus_dir: str, k: int, batch_size: int) -> Dict[str, Any]:
+    """Build one backend from the saved corpus and time queries against it (child process)"""
+    vectors = np.load(os.path.join(corpus_dir, "vectors.npy"), mmap_mode="r")
+    queries = np.load(os.path.join(corpus_dir, "queries.npy"))
+    truth = np.load(os.path.join(corpus_dir, "truth.npy"))
+    with open(os.path.join(corpus_dir, "texts.json"), encoding="utf-8") as f:
+        texts = json.load(f)
+    ids = [str(i) for i in range(len(vectors))]
+
+    work_dir = tempfile.mkdtemp(prefix=f"bench-{name}-")
+    try:
+        rss_before = _rss_mb()
+        start = time.perf_counter()
+        backend = _make_backend(name, work_dir)
+        for i in range(0, len(ids), batch_size):
+            backend.upsert(ids[i:i + batch_size], np.asarray(vectors[i:i + batch_size]),
+                           texts[i:i + batch_size], [{"row": j} for j in range(i, min(i + batch_size, len(ids)))])
+        backend.persist()
+        build_s = time.perf_counter() - start
+
+        latencies, hits = [], 0
+        for query, expected in zip(queries, truth):
+            start = time.perf_counter()
+            found, _, _, _ = backend.search_by_vector(query, k)
+            latencies.append((time.perf_counter() - start) * 1000)
+            hits += len(set(int(i) for i in found) & set(expected.tolist()))
+
+        return {
+            "backend": name,
+            "build_s": build_s,
+            "query_p50_ms": float(np.percentile(latencies, 50)),
+            "query_p99_ms": float(np.percentile(latencies, 99)),
+            f"recall@{k}": hits / (k * len(queries)),
+            "rss_mb": _rss_mb() - rss_before,
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def load_corpus(db_path: Optional[str], collection: str, synthetic: int, dim: int) -> Tuple[np.ndarray, List[str]]:
+    """Vectors and texts from an existing Chroma collection, or random ones"""
+    if db_path:
+        from VectorDB.VectorStoreBackend import ChromaBackend
+        source = ChromaBackend(collection, db_path, embedding_function=None)
+        ids, vectors = source.load_embeddings()
+        texts = [doc.page_content for doc in source.get_documents(ids)]
+        return vectors, texts
+
+    rng = np.random.default_rng(42)
+    vectors = rng.normal(size=(synthetic, dim)).astype(np.float32)
+    return vectors, [f"chunk {i}" for i in range(synthetic)]
+
+
+def benchmark(vectors: np.ndarray, texts: List[str], backends: List[str],
+              k: int = 5, num_queries: int = 200, batch_size: int = 1000) -> List[Dict[str, Any]]:
+    """Run every backend on the same corpus and the same exact ground truth"""
+    vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+    # Queries are perturbed stored vectors; ground truth is exact cosine top-k
+    rng = np.random.default_rng(7)
+    rows = rng.choice(len(vectors), size=min(num_queries, len(vectors)), replace=False)
+    queries = vectors[rows] + rng.normal(scale=0.05, size=(len(rows), vectors.shape[1])).astype(np.float32)
+    scores = queries @ vectors.T
+    truth = np.argsort(-scores, axis=1)[:, :k]
+
+    corpus_dir = tempfile.mkdtemp(prefix="bench-corpus-")
+    try:
+        np.save(os.path.join(corpus_dir, "vectors.npy"), vectors)
+        np.save(os.path.join(corpus_dir, "queries.npy"), queries)
+        np.save(os.path.join(corpus_dir, "truth.npy"), truth)
+        with open(os.path.join(corpus_dir, "texts.json"), "w", encoding="utf-8") as f:
+            json.dump(texts, f, ensure_ascii=False)
+
+        context = multiprocessing.get_context("spawn")
+        results = []
+        for name in backends:
+            with context.Pool(1) as pool:
+                results.append(pool.apply(_run_backend, (name, corpus_dir, k, batch_size)))
+        return results
+    finally:
+        shutil.rmtree(corpus_dir, ignore_errors=True)
+
+
+def format_report(results: List[Dict[str, Any]], k: int) -> str:
+    header = f"{'backend':<16} {'build s':>8} {'p50 ms':>8} {'p99 ms':>8} {f'recall@{k}':>9} {'RSS MB':>8}"
+    lines = [header, "-" * len(header)]
+    for r in results:
+        lines.append(
+            f"{r['backend']:<16} {r['build_s']:>8.2f} {r['query_p50_ms']:>8.3f} {r['query_p99_ms']:>8.3f} "
+            f"{r[f'recall@{k}']:>9.4f} {r['rss_mb']:>8.1f}"
+        )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark vector store backends")
+    parser.add_argument("--db-path", help="Persist directory of an existing Chroma collection")
+    parser.add_argument("--collection", default="Book")
+    parser.add_argument("--synthetic", type=int, default=20000, help="Random vectors when --db-path is not given")
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    corpus_vectors, corpus_texts = load_corpus(args.db_path, args.collection, args.synthetic, args.dim)
+    report = benchmark(corpus_vectors, corpus_texts, args.backends, k=args.k, num_queries=args.queries)
+    print(format_report(report, args.k))
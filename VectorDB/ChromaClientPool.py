@@ -0,0 +1,92 @@
+from typing import Any, Dict, Optional
+import os
+import threading
+import time
+
+import chromadb
+from chromadb.api.shared_system_client import SharedSystemClient
+
+
+class ChromaClientPool:
+    """
+    One persistent Chroma client per ``persist_directory`` for the whole process.
+
+    Managers ``acquire`` the client for their directory and ``release`` it
+    when they are closed or garbage collected. A client nobody holds is kept
+    for ``idle_timeout`` seconds (managers are often recreated per request)
+    and then closed, which drops its HNSW segments and SQLite handles.
+    """
+
+    def __init__(self, idle_timeout: float = 300.0):
+        self.idle_timeout = idle_timeout
+        self._clients: Dict[str, Any] = {}
+        self._refs: Dict[str, int] = {}
+        self._idle_since: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(persist_directory: str) -> str:
+        return os.path.abspath(persist_directory)
+
+    def acquire(self, persist_directory: str):
+        """Shared client for ``persist_directory``; pair with ``release``"""
+        key = self._key(persist_directory)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = chromadb.PersistentClient(path=key)
+                self._clients[key] = client
+                self._refs[key] = 0
+            self._refs[key] += 1
+            self._idle_since.pop(key, None)
+        self.close_idle()
+        return client
+
+    def release(self, persist_directory: str) -> None:
+        key = self._key(persist_directory)
+        with self._lock:
+            if self._refs.get(key, 0) == 0:
+                return
+            self._refs[key] -= 1
+            if self._refs[key] == 0:
+                self._idle_since[key] = time.monotonic()
+        self.close_idle()
+
+    def _close(self, key: str) -> None:
+        client = self._clients.pop(key)
+        self._refs.pop(key, None)
+        self._idle_since.pop(key, None)
+        # chromadb caches one System per path; stop it so its memory and files are freed
+        system = SharedSystemClient._identifier_to_system.pop(client._identifier, None)
+        if system is not None:
+            system.stop()
+
+    def close_idle(self, max_idle: Optional[float] = None) -> int:
+        """Close clients unreferenced for longer than ``max_idle`` seconds; returns how many"""
+        max_idle = self.idle_timeout if max_idle is None else max_idle
+        now = time.monotonic()
+        with self._lock:
+            expired = [key for key, since in self._idle_since.items() if now - since >= max_idle]
+            for key in expired:
+                self._close(key)
+        return len(expired)
+
+    def close_all(self) -> None:
+        with self._lock:
+            for key in list(self._clients):
+                self._close(key)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                key: {
+                    "refs": self._refs[key],
+                    "idle_s": now - self._idle_since[key] if key in self._idle_since else 0.0,
+                }
+                for key in self._clients
+            }
+
+
+# process-wide pool used by ChromaBackend
+chroma_client_pool = ChromaClientPool()
@@ -1,45 +1,540 @@
 from Embedding.EmbeddingProvider import   *
-from langchain_community.vectorstores import Chroma
 
 from langchain.schema import Document
-from typing import List
+from typing import List, Optional, Dict, Any, Iterable, Tuple
+import hashlib
+import itertools
+import os
+import queue
+import re
+import threading
+import time
+import numpy as np
+
+from Enums import VectorQuantization, VectorBackend, LexicalAnalyzer
+from VectorDB.QuantizedIndex import QuantizedIndex
+from VectorDB.MMR import mmr_select
+from VectorDB.VectorStoreBackend import VectorStoreBackend, ChromaBackend, matches_filter
+from VectorDB.InProcessVectorStore import get_in_process_store
+from VectorDB.CollectionSnapshot import CollectionSnapshot
+from VectorDB.PagedCorpus import PagedCorpus, get_paged_corpus, invalidate_paged_corpus
+from LexicalIndex.BM25Index import BM25Index, make_analyzer
+
+
+# one BM25 index object per index directory, shared by managers over the same collection;
+# each directory has its own open lock, _bm25_lock only guards the dicts
+_bm25_indexes: Dict[str, BM25Index] = {}
+_bm25_open_locks: Dict[str, threading.Lock] = {}
+_bm25_lock = threading.Lock()
+
+# likewise one quantized index per index directory, so writes through one manager
+# are seen by every other manager over the collection
+_quantized_indexes: Dict[str, QuantizedIndex] = {}
+_quantized_lock = threading.Lock()
+
+# ids written by make_chunk_id; anything else (e.g. the old ``chunk_{i}``) is a legacy id
+_CHUNK_ID = re.compile(r"[0-9a-f]{40}")
+
+# the ``source`` ArabicBookProcessor writes for a page: " اسم الكتاب : {book} - رقم الصفحه : {page}"
+_BOOK_SOURCE = re.compile(r"اسم الكتاب : (.*) - رقم الصفحه")
+
+# per-collection write generation, bumped whenever the collection's contents change;
+# result caches key on it so they never serve results from before a write
+_generations: Dict[Tuple[str, str, str], int] = {}
+_generation_lock = threading.Lock()
 
 class ChromaDBManager:
     def __init__(self, path: str, collection_name: str = 'Book',
-                 model_name: str = "mohamed2811/Muffakir_Embedding"):
+                 model_name: str = "mohamed2811/Muffakir_Embedding",
+                 embedding_provider: Optional[EmbeddingProvider] = None,
+                 quantization: Optional[VectorQuantization] = None,
+                 rescore_factor: int = 4,
+                 backend: VectorBackend = VectorBackend.CHROMA,
+                 hnsw_threshold: int = 50_000,
+                 lexical_index: bool = True,
+                 lexical_analyzer: LexicalAnalyzer = LexicalAnalyzer.ARABIC):
+        """
+        Initialize ChromaDBManager over a vector store backend: LangChain's
+        Chroma (default) or the in-process NumPy/HNSW store.
+        The embedding provider (and its model) is shared process-wide unless one is passed in.
+
+        With ``quantization`` set, searches run on an int8/binary code index
+        and rescore a small candidate set with the float vectors kept on disk.
+
+        With ``lexical_index`` a persistent BM25 index is kept next to the
+        collection and updated on every write (used by hybrid retrieval).
+        Chunks are analyzed once at ingest by ``lexical_analyzer``; queries go
+        through the same analyzer.
+        """
+        self.embedding_provider = embedding_provider or get_embedding_provider(model_name)
+        # identifies the collection for process-wide shared state (paged corpus, ...)
+        self.collection_key = (os.path.abspath(path), collection_name, backend.value)
+        self._corpus: Optional[PagedCorpus] = None
+        self._legacy_checked = False
+        self.bm25_path = os.path.join(path, f"{collection_name}_bm25") if lexical_index else None
+        self.lexical_analyzer = lexical_analyzer
+
+        if backend == VectorBackend.CHROMA:
+            self.backend: VectorStoreBackend = ChromaBackend(
+                collection_name=collection_name,
+                persist_directory=path,
+                embedding_function=self.embedding_provider
+            )
+        elif backend == VectorBackend.IN_PROCESS:
+            self.backend = get_in_process_store(
+                os.path.join(path, f"{collection_name}_inprocess"),
+                self.embedding_provider,
+                hnsw_threshold=hnsw_threshold,
+            )
+        else:
+            raise ValueError(f"Unsupported vector backend: {backend}")
+
+        # LangChain VectorStore view, used by RetrieveMethods
+        self.vector_store = self.backend.as_langchain()
+
+        self.quantized_index = None
+        if quantization is not None:
+            index_path = os.path.abspath(os.path.join(path, f"{collection_name}_{quantization.value}"))
+            with _quantized_lock:
+                self.quantized_index = _quantized_indexes.get(index_path)
+                if self.quantized_index is None:
+                    self.quantized_index = _quantized_indexes[index_path] = QuantizedIndex(
+                        index_path,
+                        mode=quantization,
+                        rescore_factor=rescore_factor,
+                    )
+                    if len(self.quantized_index) != self.get_collection_count():
+                        self.quantized_index.build(*self.backend.load_embeddings())
+
+    @property
+    def corpus(self) -> PagedCorpus:
+        """Lazy paged view of the collection's texts, shared by managers over the same collection"""
+        if self._corpus is None:
+            self._corpus = get_paged_corpus(self.collection_key, self.backend)
+        return self._corpus
+
+    @property
+    def bm25(self) -> BM25Index:
+        """
+        The collection's BM25 index, opened once per process. At open, its
+        applied-ids count is checked against the collection; if they differ
+        (first use, or a crash between a store write and its BM25 update) it
+        is rebuilt from the paged corpus and persisted. Later accesses take no lock.
+        """
+        if self.bm25_path is None:
+            raise ValueError("ChromaDBManager was created without a lexical index")
+        index = _bm25_indexes.get(self.bm25_path)
+        if index is not None:
+            return index
+        return self._open_bm25(rebuild=False)
+
+    def _open_bm25(self, rebuild: bool) -> BM25Index:
+        """Open the shared BM25 index, re-indexing the corpus if ``rebuild`` or its count is off"""
+        with _bm25_lock:
+            open_lock = _bm25_open_locks.setdefault(self.bm25_path, threading.Lock())
+        with open_lock:
+            index = _bm25_indexes.get(self.bm25_path)
+            if index is None:
+                index = BM25Index(self.bm25_path, analyzer=make_analyzer(self.lexical_analyzer))
+            if rebuild or len(index) != self.get_collection_count():
+                print(f"[bm25] indexing {self.get_collection_count()} chunks into {self.bm25_path}")
+                index.rebuild((chunk_id, text)
+                              for ids, texts, _ in self.corpus.iter_pages()
+                              for chunk_id, text in zip(ids, texts))
+            _bm25_indexes[self.bm25_path] = index
+        return index
+
+    @property
+    def generation(self) -> int:
+        """Write generation of the collection, shared by managers over the same collection"""
+        return _generations.get(self.collection_key, 0)
+
+    def _bump_generation(self) -> None:
+        with _generation_lock:
+            _generations[self.collection_key] = _generations.get(self.collection_key, 0) + 1
+
+    @staticmethod
+    def make_chunk_id(document: Document) -> str:
+        """Stable id derived from the chunk's source, page and content"""
+        metadata = document.metadata or {}
+        key = "\x1f".join([
+            str(metadata.get("source", "")),
+            str(metadata.get("page_number", "")),
+            document.page_content,
+        ])
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+    def migrate_legacy_ids(self, page_size: int = 1000) -> int:
+        """
+        Re-key chunks stored under non content-addressed ids (collections built
+        with the old ``chunk_{i}`` ids) to ``make_chunk_id``, reusing their
+        stored embeddings, so re-ingesting a book skips them instead of adding
+        duplicates. Runs before the first write of every manager; a no-op once
+        the collection is migrated. Returns the number of re-keyed chunks.
+        """
+        self._legacy_checked = True
+        legacy = [chunk_id for chunk_id in self.backend.all_ids() if not _CHUNK_ID.fullmatch(chunk_id)]
+        if not legacy:
+            return 0
+
+        print(f"[migrate] re-keying {len(legacy)} chunks with legacy ids to content-addressed ids")
+        legacy_set = set(legacy)
+        # rows written here are appended and never legacy, so paging over the store stays valid;
+        # the old rows are deleted once the pass is over
+        for ids, embeddings, texts, metadatas in self.backend.iter_records(page_size):
+            # legacy duplicates of one chunk collapse into one id
+            rekeyed = {self.make_chunk_id(Document(page_content=texts[i], metadata=metadatas[i])): i
+                       for i, chunk_id in enumerate(ids) if chunk_id in legacy_set}
+            if not rekeyed:
+                continue
+            rows = list(rekeyed.values())
+            self._write_batch(list(rekeyed), embeddings[rows], [texts[i] for i in rows],
+                              [self.with_filter_fields(metadatas[i]) for i in rows])
+        self._delete(legacy)
+
+        self._persist()
+        invalidate_paged_corpus(self.collection_key)
+        self._bump_generation()
+        return len(legacy)
+
+    @staticmethod
+    def with_filter_fields(metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        ``metadata`` with the ``book`` / ``page`` fields build_filter matches on,
+        derived from ``source`` / ``page_number`` for chunks stored before
+        ArabicBookProcessor wrote them. Returned unchanged when nothing is missing.
+        """
+        missing = {}
+        if "book" not in metadata:
+            match = _BOOK_SOURCE.search(str(metadata.get("source", "")))
+            if match:
+                missing["book"] = match.group(1).strip()
+        if "page" not in metadata and str(metadata.get("page_number", "")).isdigit():
+            missing["page"] = int(metadata["page_number"])
+        return {**metadata, **missing} if missing else metadata
+
+    def backfill_filter_fields(self, page_size: int = 1000) -> int:
+        """
+        Add the ``book`` / ``page`` filter fields to stored chunks that lack them
+        (see with_filter_fields), reusing their stored embeddings. Ids hash
+        ``source`` / ``page_number`` only, so re-ingesting a book skips such
+        chunks as unchanged and would never write the fields otherwise. Runs
+        with migrate_legacy_ids before the first write of every manager;
+        returns the number of updated chunks.
+        """
+        # cheap pass without embeddings; most collections have nothing to update
+        stale, offset = set(), 0
+        while True:
+            ids, _, metadatas = self.backend.get_page(offset, page_size)
+            if not ids:
+                break
+            stale.update(chunk_id for chunk_id, metadata in zip(ids, metadatas)
+                         if self.with_filter_fields(metadata) is not metadata)
+            offset += len(ids)
+        if not stale:
+            return 0
+
+        print(f"[migrate] adding book/page filter fields to {len(stale)} chunks")
+        for ids, embeddings, texts, metadatas in self.backend.iter_records(page_size):
+            rows = [i for i, chunk_id in enumerate(ids) if chunk_id in stale]
+            if not rows:
+                continue
+            # same ids, texts and embeddings: only the stored metadata changes,
+            # so the lexical and quantized indexes stay as they are
+            self.backend.upsert([ids[i] for i in rows], embeddings[rows], [texts[i] for i in rows],
+                                [self.with_filter_fields(metadatas[i]) for i in rows])
+
+        self.backend.persist()
+        invalidate_paged_corpus(self.collection_key)
+        self._bump_generation()
+        return len(stale)
+
+    def _persist(self) -> None:
+        """Flush the store and the quantized index's in-memory ids and codes"""
+        self.backend.persist()
+        if self.quantized_index is not None:
+            self.quantized_index.persist()
+
+    def _delete(self, ids: List[str]) -> None:
+        self.backend.delete(ids)
+        if self.quantized_index is not None:
+            self.quantized_index.remove(ids)
+        if self.bm25_path is not None:
+            self.bm25.remove(ids)
+
+    def add_documents(self, documents: List[Document], delete_missing: bool = False) -> Dict[str, Any]:
+        """
+        Upsert documents into the collection.
+
+        Ids are content-addressed, so chunks that are already stored are
+        skipped without being embedded. Chunks stored under legacy ids are
+        re-keyed first (see migrate_legacy_ids). With ``delete_missing`` the
+        call is treated as the full corpus: stored chunks not in ``documents`` are removed.
+        """
+        return self.add_documents_stream(iter(documents), delete_missing=delete_missing)
+
+    def _prepare_batch(self, batch: List[Document], seen: set):
+        """Drop duplicates and stored chunks, then embed what is left"""
+        unique: Dict[str, Document] = {}
+        for doc in batch:
+            chunk_id = self.make_chunk_id(doc)
+            if chunk_id not in seen:
+                unique.setdefault(chunk_id, doc)
+        seen.update(unique)
+
+        ids = list(unique)
+        existing = self.backend.existing_ids(ids)
+        new_ids = [chunk_id for chunk_id in ids if chunk_id not in existing]
+        if not new_ids:
+            return None, len(existing)
+
+        texts = [unique[chunk_id].page_content for chunk_id in new_ids]
+        # Hand the float32 matrix straight to the collection, no list round-trip
+        embeddings = self.embedding_provider.embed_array(texts)
+        metadatas = [unique[chunk_id].metadata for chunk_id in new_ids]
+        return (new_ids, embeddings, texts, metadatas), len(existing)
+
+    def _write_batch(self, new_ids, embeddings, texts, metadatas) -> int:
+        """Upsert one prepared batch; returns the bytes handed to the store"""
+        # opened (and checked) before the upsert, so the check never sees a half-applied batch
+        bm25 = self.bm25 if self.bm25_path is not None else None
+        self.backend.upsert(new_ids, embeddings, texts, metadatas)
+        if bm25 is not None:
+            # applied only after a successful upsert; a crash in between is caught by the open check
+            bm25.add(new_ids, texts)
+        if self.quantized_index is not None:
+            self.quantized_index.add(new_ids, embeddings)
+        return int(embeddings.nbytes) + sum(len(text.encode("utf-8")) for text in texts)
+
+    def add_documents_stream(self, documents: Iterable[Document], batch_size: int = 256,
+                             checkpoint_every: int = 20, max_pending: int = 2,
+                             delete_missing: bool = False) -> Dict[str, Any]:
         """
-        Initialize ChromaDBManager with LangChain's Chroma vector store.
+        Embed and write an iterator of documents in bounded memory.
+
+        Batches of ``batch_size`` are embedded on the calling thread and written
+        by a writer thread; at most ``max_pending`` embedded batches wait for the
+        writer, so a slow store throttles embedding instead of growing memory.
+        The store is persisted every ``checkpoint_every`` batches, so a failure
+        keeps everything written up to then.
         """
-        self.embedding_provider = EmbeddingProvider(model_name=model_name)
+        if not self._legacy_checked:
+            self.migrate_legacy_ids()
+            self.backfill_filter_fields()
 
-        self.vector_store = Chroma(
-            collection_name=collection_name,
-            persist_directory=path,
-            embedding_function=self.embedding_provider
+        pending: "queue.Queue" = queue.Queue(maxsize=max_pending)
+        stats = {"chunks": 0, "added": 0, "unchanged": 0, "deleted": 0, "batches": 0, "bytes_written": 0}
+        errors: List[BaseException] = []
 
-        )
+        def writer():
+            while True:
+                item = pending.get()
+                if item is None:
+                    return
+                if errors:
+                    continue  # drain so the producer never blocks after a failure
+                try:
+                    stats["bytes_written"] += self._write_batch(*item)
+                    stats["added"] += len(item[0])
+                    stats["batches"] += 1
+                    if stats["batches"] % checkpoint_every == 0:
+                        self._persist()
+                        self._log_progress(stats, started)
+                except BaseException as e:
+                    errors.append(e)
 
-    def add_documents(self, documents: List[Document]):
-        """Add documents to the Chroma collection"""
-        ids = [f"chunk_{i}" for i in range(len(documents))]
+        started = time.perf_counter()
+        thread = threading.Thread(target=writer, name="chroma-writer", daemon=True)
+        thread.start()
 
-        self.vector_store.add_documents(
-            documents=documents,
-            ids=ids
-        )
-        self.vector_store.persist()  # Ensure persistence
-        print(f"Stored {len(documents)} documents in the collection.")
+        seen: set = set()
+        completed = False
+        try:
+            try:
+                batch: List[Document] = []
+                for doc in itertools.chain(documents, [None]):
+                    if doc is not None:
+                        batch.append(doc)
+                        if len(batch) < batch_size:
+                            continue
+                    if batch:
+                        stats["chunks"] += len(batch)
+                        prepared, unchanged = self._prepare_batch(batch, seen)
+                        stats["unchanged"] += unchanged
+                        if prepared is not None:
+                            pending.put(prepared)  # blocks while the writer is behind
+                        batch = []
+                    if errors:
+                        break
+            finally:
+                pending.put(None)
+                thread.join()
 
-    def similarity_search(self, query: str, k: int = 2) -> List[Document]:
+            if errors:
+                raise errors[0]
+
+            if delete_missing:
+                deleted = [chunk_id for chunk_id in self.backend.all_ids() if chunk_id not in seen]
+                if deleted:
+                    self._delete(deleted)
+                stats["deleted"] = len(deleted)
+            completed = True
+        finally:
+            # also after a writer or producer (embedding) failure: batches written
+            # before it are persisted and made visible to corpus and result caches
+            self._persist()
+            invalidate_paged_corpus(self.collection_key)
+            if stats["added"] or stats["deleted"] or not completed:
+                self._bump_generation()
+        self._log_progress(stats, started)
+        print(f"Stored {stats['added']} new documents in the collection "
+              f"({stats['unchanged']} unchanged, {stats['deleted']} deleted).")
+        return stats
+
+    @staticmethod
+    def _log_progress(stats: Dict[str, Any], started: float) -> None:
+        """Fill in throughput figures and print a progress line"""
+        elapsed = time.perf_counter() - started
+        stats["seconds"] = elapsed
+        stats["chunks_per_sec"] = stats["chunks"] / elapsed if elapsed else 0.0
+        stats["mb_written"] = stats["bytes_written"] / 1024 ** 2
+        print(f"[ingest] {stats['chunks']} chunks, {stats['added']} written, "
+              f"{stats['chunks_per_sec']:.1f} chunks/s, {stats['mb_written']:.1f} MB")
+
+    @staticmethod
+    def build_filter(book: Optional[str] = None,
+                     page_range: Optional[Tuple[int, int]] = None,
+                     source: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Build a Chroma ``where`` filter from chunk metadata written by
+        ArabicBookProcessor. ``page_range`` is inclusive on both ends.
+        """
+        conditions = []
+        if book is not None:
+            conditions.append({"book": book})
+        if source is not None:
+            conditions.append({"source": source})
+        if page_range is not None:
+            first, last = page_range
+            conditions.append({"page": {"$gte": int(first)}})
+            conditions.append({"page": {"$lte": int(last)}})
+
+        if not conditions:
+            return None
+        if len(conditions) == 1:
+            return conditions[0]
+        return {"$and": conditions}
+
+    def search_by_vector(self, query_vector: np.ndarray, k: int = 2,
+                         filter: Optional[Dict[str, Any]] = None
+                         ) -> Tuple[List[str], np.ndarray, List[Document]]:
+        """
+        Top-k chunk ids, cosine similarities and documents for an already
+        embedded query, so callers searching several collections embed once.
+        """
+        if self.quantized_index is not None and filter is None:
+            ids, scores = self.quantized_index.search(query_vector, k)
+            # the index can be ahead of the store (e.g. a delete elsewhere): keep only ids still stored
+            found = self.backend.get_documents_by_id(ids)
+            keep = [i for i, chunk_id in enumerate(ids) if chunk_id in found]
+            return [ids[i] for i in keep], scores[keep], [found[ids[i]] for i in keep]
 
-        return self.vector_store.similarity_search(query, k)
+        ids, scores, docs, _ = self.backend.search_by_vector(query_vector, k, filter=filter)
+        return ids, scores, docs
+
+    def similarity_search(self, query: str, k: int = 2,
+                          filter: Optional[Dict[str, Any]] = None) -> List[Document]:
+        # The quantized index holds no metadata; filtered searches are pushed down to the store
+        if self.quantized_index is not None and filter is None:
+            ids, _ = self.quantized_index.search(self.embedding_provider.embed_query_array(query), k)
+            return self.backend.get_documents(ids)
+
+        # through the backend rather than LangChain, so documents carry their chunk_id
+        return self.search_by_vector(self.embedding_provider.embed_query_array(query), k, filter=filter)[2]
     
-    def max_marginal_relevance_search(self, query: str, k: int = 2 ,fetch_k:int=12) -> List[Document]:
-        return self.vector_store.max_marginal_relevance_search(query, k,fetch_k)
+    def max_marginal_relevance_search(self, query: str, k: int = 2 ,fetch_k:int=12,
+                                      filter: Optional[Dict[str, Any]] = None,
+                                      lambda_mult: float = 0.5) -> List[Document]:
+        """
+        MMR over the ``fetch_k`` first-stage candidates. The query is embedded
+        once and the candidates' vectors come back with the search as one
+        float32 matrix, so nothing is re-fetched or re-embedded.
+        """
+        query_vector = self.embedding_provider.embed_query_array(query)
+        if self.quantized_index is not None and filter is None:
+            ids, _, vectors = self.quantized_index.search_with_vectors(query_vector, fetch_k)
+            selected = mmr_select(query_vector, vectors, k, lambda_mult)
+            return self.backend.get_documents([ids[i] for i in selected])
+
+        _, _, docs, vectors = self.backend.search_by_vector(query_vector, fetch_k, filter=filter,
+                                                            include_embeddings=True)
+        return [docs[i] for i in mmr_select(query_vector, vectors, k, lambda_mult)]
+
+    def lexical_search_with_scores(self, query: str, k: int = 2,
+                                   filter: Optional[Dict[str, Any]] = None
+                                   ) -> Tuple[List[str], np.ndarray, List[Document]]:
+        """
+        BM25 top-k chunk ids, scores and documents from the persistent index.
+        The index holds no metadata, so with a ``filter`` candidates are
+        over-fetched and checked against it.
+        """
+        n = k if filter is None else 4 * k
+        while True:
+            ids, scores = self.bm25.search(query, n)
+            # keyed by the ids the store returned; hits without a stored chunk are dropped
+            by_id = self.backend.get_documents_by_id(ids)
+            keep = [i for i, chunk_id in enumerate(ids)
+                    if chunk_id in by_id and (filter is None or matches_filter(by_id[chunk_id].metadata, filter))]
+            if len(keep) >= k or len(ids) < n:
+                keep = keep[:k]
+                return [ids[i] for i in keep], scores[keep], [by_id[ids[i]] for i in keep]
+            n *= 4
+
+    def lexical_search(self, query: str, k: int = 2,
+                       filter: Optional[Dict[str, Any]] = None) -> List[Document]:
+        return self.lexical_search_with_scores(query, k, filter=filter)[2]
 
+    def quantization_report(self, queries: Optional[List[str]] = None, k: int = 5) -> Dict[str, Any]:
+        """
+        Recall-vs-memory report of the quantized index. Without ``queries``,
+        a sample of stored vectors is used as queries.
+        """
+        if self.quantized_index is None:
+            raise ValueError("ChromaDBManager was created without quantization")
+
+        if queries:
+            query_vectors = self.embedding_provider.embed_array(queries)
+        else:
+            query_vectors = self.quantized_index.sample_vectors(100)
+        return self.quantized_index.recall_report(query_vectors, k=k)
+
+
+    def export_snapshot(self, out_dir: str) -> Dict[str, Any]:
+        """Write the collection as a memory-mappable snapshot (see CollectionSnapshot)"""
+        return CollectionSnapshot(out_dir).export(self.backend, namespace=self.embedding_provider.cache_namespace())
+
+    def import_snapshot(self, snapshot_dir: str) -> int:
+        """
+        Load a snapshot into this collection without re-embedding. Into an empty
+        in-process store this is a file copy, so a new node serves queries at once.
+        """
+        rows = CollectionSnapshot(snapshot_dir).restore(self.backend, namespace=self.embedding_provider.cache_namespace())
+        if self.quantized_index is not None:
+            self.quantized_index.build(*self.backend.load_embeddings())
+        invalidate_paged_corpus(self.collection_key)
+        if self.bm25_path is not None:
+            # the restored rows never went through bm25.add; the count check alone
+            # would miss a snapshot as large as the old collection
+            self._open_bm25(rebuild=True)
+        self._bump_generation()
+        return rows
 
     def get_collection_count(self) -> int:
-        return self.vector_store._collection.count()
+        return self.backend.count()
+
+    def close(self) -> None:
+        """Release the backend's shared client (the pool closes it once idle)"""
+        self.backend.close()
 
 
 
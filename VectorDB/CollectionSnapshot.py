@@ -0,0 +1,258 @@
+"""
+Compact, memory-mappable snapshot of one collection for fast cold starts.
+
+Usage:
+    python -m VectorDB.CollectionSnapshot export --db-path ./DB --collection Book --out ./snapshots/Book
+    python -m VectorDB.CollectionSnapshot import --snapshot ./snapshots/Book --db-path ./DB --collection Book --backend in_process
+"""
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import argparse
+import json
+import logging
+import os
+import shutil
+import time
+
+import numpy as np
+
+from VectorDB.VectorStoreBackend import VectorStoreBackend
+from VectorDB.InProcessVectorStore import InProcessVectorStore
+
+
+logger = logging.getLogger(__name__)
+
+
+class CollectionSnapshot:
+    """
+    Snapshot directory layout:
+      - ``manifest.json``: rows, dim, embedding namespace and metadata column types
+      - ``vectors.f32``: normalized float32 vectors, row-major
+      - ``ids.txt``: one chunk id per row
+      - ``texts.bin`` / ``text_offsets.i64``: UTF-8 texts and their end offsets
+      - ``columns/<n>.npy``: one array per metadata key (int64, float64, bool, or
+        int32 codes into ``columns/<n>.values.json`` for strings) plus
+        ``columns/<n>.mask.npy`` marking the rows that have the key
+      - ``hnsw.bin``: HNSW graph, when exported from an in-process store that has one
+
+    Vector, text and column files have the same layout the in-process store
+    uses, so restoring into it is a file copy and nothing is re-embedded.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._manifest: Optional[Dict[str, Any]] = None
+
+    def _file(self, *names: str) -> str:
+        return os.path.join(self.path, *names)
+
+    @property
+    def manifest(self) -> Dict[str, Any]:
+        if self._manifest is None:
+            with open(self._file("manifest.json"), encoding="utf-8") as f:
+                self._manifest = json.load(f)
+        return self._manifest
+
+    # ------------------------------------------------------------------ export
+    @staticmethod
+    def _column_type(values: List[Any]) -> str:
+        kinds = {type(v) for v in values}
+        if kinds == {bool}:
+            return "bool"
+        if kinds == {int}:
+            return "int"
+        if kinds <= {int, float}:
+            return "float"
+        if kinds == {str}:
+            return "str"
+        return "json"
+
+    def _write_columns(self, columns: Dict[str, Dict[int, Any]], rows: int) -> Dict[str, Dict[str, Any]]:
+        os.makedirs(self._file("columns"), exist_ok=True)
+        layout = {}
+        for n, (key, values) in enumerate(sorted(columns.items())):
+            kind = self._column_type(list(values.values()))
+            mask = np.zeros(rows, dtype=bool)
+            mask[list(values)] = True
+
+            if kind == "str" or kind == "json":
+                encoded = {row: v if kind == "str" else json.dumps(v, ensure_ascii=False) for row, v in values.items()}
+                vocabulary = sorted(set(encoded.values()))
+                codes_of = {v: i for i, v in enumerate(vocabulary)}
+                data = np.full(rows, -1, dtype=np.int32)
+                for row, v in encoded.items():
+                    data[row] = codes_of[v]
+                with open(self._file("columns", f"{n}.values.json"), "w", encoding="utf-8") as f:
+                    json.dump(vocabulary, f, ensure_ascii=False)
+            else:
+                dtype = {"bool": bool, "int": np.int64, "float": np.float64}[kind]
+                data = np.zeros(rows, dtype=dtype)
+                for row, v in values.items():
+                    data[row] = v
+
+            np.save(self._file("columns", f"{n}.npy"), data)
+            np.save(self._file("columns", f"{n}.mask.npy"), mask)
+            layout[key] = {"file": n, "type": kind}
+        return layout
+
+    def export(self, backend: VectorStoreBackend, namespace: Optional[str] = None,
+               page_size: int = 5000) -> Dict[str, Any]:
+        """Stream every row of ``backend`` into this snapshot directory"""
+        start = time.perf_counter()
+        if os.path.exists(self.path):
+            shutil.rmtree(self.path)
+        os.makedirs(self.path)
+
+        rows, dim, end = 0, None, 0
+        columns: Dict[str, Dict[int, Any]] = {}
+        with open(self._file("vectors.f32"), "wb") as vectors_f, \
+                open(self._file("ids.txt"), "w", encoding="utf-8") as ids_f, \
+                open(self._file("texts.bin"), "wb") as texts_f, \
+                open(self._file("text_offsets.i64"), "wb") as offsets_f:
+            for ids, embeddings, texts, metadatas in backend.iter_records(page_size):
+                vectors = embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+                dim = vectors.shape[1]
+                encoded = [text.encode("utf-8") for text in texts]
+                offsets = end + np.cumsum([len(b) for b in encoded], dtype=np.int64)
+                end = int(offsets[-1]) if len(offsets) else end
+
+                vectors_f.write(vectors.astype(np.float32).tobytes())
+                texts_f.write(b"".join(encoded))
+                offsets_f.write(offsets.tobytes())
+                ids_f.writelines(chunk_id + "\n" for chunk_id in ids)
+                for row, metadata in enumerate(metadatas, start=rows):
+                    for key, value in metadata.items():
+                        columns.setdefault(key, {})[row] = value
+                rows += len(ids)
+
+        # An in-process graph is reusable as is when its labels are these row numbers
+        if isinstance(backend, InProcessVectorStore) and backend._hnsw is not None and backend.alive.all():
+            backend.persist()
+            shutil.copyfile(backend._file("hnsw.bin"), self._file("hnsw.bin"))
+
+        self._manifest = {
+            "rows": rows,
+            "dim": dim,
+            "namespace": namespace,
+            "columns": self._write_columns(columns, rows),
+            "created": time.time(),
+        }
+        with open(self._file("manifest.json"), "w", encoding="utf-8") as f:
+            json.dump(self._manifest, f, ensure_ascii=False, indent=2)
+
+        logger.info(f"Exported {rows} rows to {self.path} in {time.perf_counter() - start:.1f}s")
+        return self._manifest
+
+    # ------------------------------------------------------------------ read
+    def vectors(self) -> np.memmap:
+        return np.memmap(self._file("vectors.f32"), dtype=np.float32, mode="r",
+                         shape=(self.manifest["rows"], self.manifest["dim"]))
+
+    def ids(self) -> List[str]:
+        with open(self._file("ids.txt"), encoding="utf-8") as f:
+            return f.read().splitlines()
+
+    def metadata_columns(self) -> Dict[str, Tuple[np.ndarray, np.ndarray, Optional[List[str]]]]:
+        """key -> (memory-mapped values, presence mask, string vocabulary or None)"""
+        result = {}
+        for key, column in self.manifest["columns"].items():
+            n = column["file"]
+            values = np.load(self._file("columns", f"{n}.npy"), mmap_mode="r")
+            mask = np.load(self._file("columns", f"{n}.mask.npy"), mmap_mode="r")
+            vocabulary = None
+            if column["type"] in ("str", "json"):
+                with open(self._file("columns", f"{n}.values.json"), encoding="utf-8") as f:
+                    vocabulary = json.load(f)
+            result[key] = (values, mask, vocabulary)
+        return result
+
+    def iter_metadatas(self) -> Iterator[Dict[str, Any]]:
+        """Row metadata rebuilt from the columns, one dict per row"""
+        columns = self.metadata_columns()
+        types = {key: column["type"] for key, column in self.manifest["columns"].items()}
+        for row in range(self.manifest["rows"]):
+            metadata = {}
+            for key, (values, mask, vocabulary) in columns.items():
+                if not mask[row]:
+                    continue
+                if types[key] == "str":
+                    metadata[key] = vocabulary[values[row]]
+                elif types[key] == "json":
+                    metadata[key] = json.loads(vocabulary[values[row]])
+                else:
+                    metadata[key] = values[row].item()
+            yield metadata
+
+    def iter_records(self, page_size: int = 5000):
+        """Pages of (ids, embeddings, texts, metadatas), like VectorStoreBackend.iter_records"""
+        ids, vectors = self.ids(), self.vectors()
+        offsets = np.fromfile(self._file("text_offsets.i64"), dtype=np.int64)
+        metadatas = self.iter_metadatas()
+        with open(self._file("texts.bin"), "rb") as texts_f:
+            for i in range(0, len(ids), page_size):
+                j = min(i + page_size, len(ids))
+                start = int(offsets[i - 1]) if i else 0
+                blob = texts_f.read(int(offsets[j - 1]) - start)
+                bounds = np.concatenate([[0], offsets[i:j] - start])
+                texts = [blob[bounds[r]:bounds[r + 1]].decode("utf-8") for r in range(j - i)]
+                yield ids[i:j], np.asarray(vectors[i:j]), texts, [next(metadatas) for _ in range(j - i)]
+
+    # ------------------------------------------------------------------ import
+    def _check_namespace(self, namespace: Optional[str]) -> None:
+        stored = self.manifest.get("namespace")
+        if namespace and stored and namespace != stored:
+            raise ValueError(f"Snapshot was embedded with {stored}, the target uses {namespace}")
+
+    def _restore_files(self, store: InProcessVectorStore) -> None:
+        """Empty in-process store: copy the files over instead of replaying rows"""
+        with store._locked(exclusive=True):
+            self._copy_files(store)
+            store.reload()
+
+    def _copy_files(self, store: InProcessVectorStore) -> None:
+        for name in ("vectors.f32", "ids.txt", "texts.bin", "text_offsets.i64", "hnsw.bin"):
+            if os.path.exists(self._file(name)):
+                shutil.copyfile(self._file(name), store._file(name))
+        with open(store._file("metadata.jsonl"), "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(m, ensure_ascii=False) + "\n" for m in self.iter_metadatas())
+        np.save(store._file("alive.npy"), np.ones(self.manifest["rows"], dtype=bool))
+        with open(store._file("dim.json"), "w") as f:
+            json.dump({"dim": self.manifest["dim"]}, f)
+
+    def restore(self, backend: VectorStoreBackend, namespace: Optional[str] = None,
+                page_size: int = 5000) -> int:
+        """Load the snapshot into ``backend`` without re-embedding; returns the rows restored"""
+        self._check_namespace(namespace)
+        start = time.perf_counter()
+
+        if isinstance(backend, InProcessVectorStore) and backend.count() == 0 and not backend.ids:
+            self._restore_files(backend)
+        else:
+            for ids, embeddings, texts, metadatas in self.iter_records(page_size):
+                backend.upsert(ids, embeddings, texts, metadatas)
+            backend.persist()
+
+        logger.info(f"Restored {self.manifest['rows']} rows from {self.path} in {time.perf_counter() - start:.1f}s")
+        return self.manifest["rows"]
+
+
+if __name__ == "__main__":
+    from Enums import VectorBackend
+    from VectorDB.ChromaDBManager import ChromaDBManager
+
+    parser = argparse.ArgumentParser(description="Export or import a collection snapshot")
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("--db-path", required=True)
+    parser.add_argument("--collection", default="Book")
+    parser.add_argument("--backend", default=VectorBackend.CHROMA.value, choices=[b.value for b in VectorBackend])
+    parser.add_argument("--model", default="mohamed2811/Muffakir_Embedding")
+    parser.add_argument("--out", help="Snapshot directory to write (export)")
+    parser.add_argument("--snapshot", help="Snapshot directory to read (import)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    manager = ChromaDBManager(args.db_path, args.collection, model_name=args.model,
+                              backend=VectorBackend(args.backend))
+    if args.command == "export":
+        print(json.dumps(manager.export_snapshot(args.out), indent=2))
+    else:
+        print(f"Restored {manager.import_snapshot(args.snapshot)} rows")
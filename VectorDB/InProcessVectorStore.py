@@ -0,0 +1,434 @@
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+import json
+import logging
+import os
+import threading
+import uuid
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, stores must not be shared between processes
+    fcntl = None
+
+import numpy as np
+from langchain.schema import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from VectorDB.VectorStoreBackend import VectorStoreBackend, matches_filter
+from VectorDB.MMR import mmr_select
+
+
+class InProcessVectorStore(VectorStore, VectorStoreBackend):
+    """
+    In-process vector store kept as plain files under ``path``.
+
+    Small collections are searched exactly with one NumPy matrix product;
+    once ``hnsw_threshold`` live vectors are stored an HNSW graph (hnswlib)
+    is built and used instead. Rows are append-only: replaced or deleted
+    rows are only marked dead.
+
+    Open stores through ``get_in_process_store`` so every manager in the
+    process shares one instance per directory. Across processes, writes
+    hold an exclusive ``flock`` on ``.lock`` and every access reloads the
+    files first if another process changed them.
+
+    Files:
+      - ``vectors.f32``: normalized float32 vectors, row-major (memory-mapped)
+      - ``ids.txt``: one chunk id per row
+      - ``texts.bin`` / ``text_offsets.i64``: UTF-8 texts and their end offsets (memory-mapped)
+      - ``metadata.jsonl``: one JSON metadata object per row
+      - ``alive.npy``: row liveness mask
+      - ``dim.json``: vector dimension
+      - ``hnsw.bin``: HNSW graph, when built
+    """
+
+    def __init__(self, path: str, embedding: Embeddings, hnsw_threshold: int = 50_000,
+                 hnsw_m: int = 16, ef_construction: int = 200, ef_search: int = 64):
+        self.path = path
+        self.embedding = embedding
+        self.hnsw_threshold = hnsw_threshold
+        self.hnsw_m = hnsw_m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.logger = logging.getLogger(__name__)
+        os.makedirs(path, exist_ok=True)
+
+        self.dim: Optional[int] = None
+        self.ids: List[str] = []
+        self.metadatas: List[Dict[str, Any]] = []
+        self.alive = np.zeros(0, dtype=bool)
+        self._rows: Dict[str, int] = {}
+        self._vectors: Optional[np.memmap] = None
+        self._texts: Optional[np.memmap] = None
+        self._offsets = np.zeros(0, dtype=np.int64)
+        self._hnsw = None
+        self._lock = threading.RLock()
+        self._lock_file = None  # open while this process holds the file lock
+        self._seen = ()         # file signature last loaded or written; () forces the first load
+
+        with self._locked():
+            pass
+
+    # ------------------------------------------------------------------ files
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _signature(self) -> Optional[Tuple[int, int, int]]:
+        """Changes whenever rows are appended (ids.txt) or liveness is rewritten (alive.npy)"""
+        try:
+            ids, alive = os.stat(self._file("ids.txt")), os.stat(self._file("alive.npy"))
+        except FileNotFoundError:
+            return None
+        return ids.st_size, alive.st_ino, alive.st_mtime_ns
+
+    @contextmanager
+    def _locked(self, exclusive: bool = False):
+        """
+        Thread lock plus a shared/exclusive flock on the store's files; on the
+        outermost entry the files are reloaded if another process changed them.
+        """
+        with self._lock:
+            if self._lock_file is not None:
+                yield  # re-entered by the thread already holding the locks
+                return
+            with open(self._file(".lock"), "a") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                self._lock_file = lock_file
+                try:
+                    if self._signature() != self._seen:
+                        self.reload()
+                    yield
+                    if exclusive:
+                        self._seen = self._signature()
+                finally:
+                    self._lock_file = None
+                    if fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _save_alive(self) -> None:
+        # replaced, not rewritten in place, so readers never see a partial file
+        tmp = self._file("alive.npy.tmp")
+        with open(tmp, "wb") as f:
+            np.save(f, self.alive)
+        os.replace(tmp, self._file("alive.npy"))
+
+    def _load(self) -> None:
+        self._seen = self._signature()
+        if not os.path.exists(self._file("dim.json")):
+            return
+        with open(self._file("dim.json")) as f:
+            self.dim = json.load(f)["dim"]
+        with open(self._file("ids.txt"), encoding="utf-8") as f:
+            self.ids = f.read().splitlines()
+        with open(self._file("metadata.jsonl"), encoding="utf-8") as f:
+            self.metadatas = [json.loads(line) for line in f]
+        self._offsets = np.fromfile(self._file("text_offsets.i64"), dtype=np.int64)
+
+        # A crash between appends can leave files of different lengths; trust the shortest
+        rows = min(len(self.ids), len(self.metadatas), len(self._offsets),
+                   os.path.getsize(self._file("vectors.f32")) // (4 * self.dim))
+        self.ids, self.metadatas, self._offsets = self.ids[:rows], self.metadatas[:rows], self._offsets[:rows]
+
+        alive = np.load(self._file("alive.npy")) if os.path.exists(self._file("alive.npy")) else np.ones(0, dtype=bool)
+        self.alive = np.ones(rows, dtype=bool)
+        self.alive[:min(rows, len(alive))] = alive[:rows]
+        self._rows = {chunk_id: row for row, chunk_id in enumerate(self.ids) if self.alive[row]}
+        self._open_maps()
+
+        if self.count() >= self.hnsw_threshold:
+            if os.path.exists(self._file("hnsw.bin")):
+                self._load_hnsw()
+            else:
+                self._build_hnsw()
+
+    def reload(self) -> None:
+        """Re-read the store's files, e.g. after they were replaced by a snapshot restore"""
+        with self._lock:
+            self.dim, self.ids, self.metadatas = None, [], []
+            self.alive = np.zeros(0, dtype=bool)
+            self._rows, self._offsets, self._hnsw = {}, np.zeros(0, dtype=np.int64), None
+            self._load()
+
+    def _open_maps(self) -> None:
+        if not self.ids:
+            self._vectors, self._texts = None, None
+            return
+        self._vectors = np.memmap(self._file("vectors.f32"), dtype=np.float32, mode="r",
+                                  shape=(len(self.ids), self.dim))
+        text_bytes = int(self._offsets[-1])
+        self._texts = np.memmap(self._file("texts.bin"), dtype=np.uint8, mode="r",
+                                shape=(text_bytes,)) if text_bytes else None
+
+    def _text(self, row: int) -> str:
+        start = int(self._offsets[row - 1]) if row else 0
+        end = int(self._offsets[row])
+        return bytes(self._texts[start:end]).decode("utf-8") if end > start else ""
+
+    # ------------------------------------------------------------------ hnsw
+    def _load_hnsw(self) -> None:
+        import hnswlib
+
+        index = hnswlib.Index(space="ip", dim=self.dim)
+        index.load_index(self._file("hnsw.bin"), max_elements=len(self.ids))
+        index.set_ef(self.ef_search)
+        self._hnsw = index
+
+        # Catch up with rows written or deleted after the graph was last saved
+        labels = set(index.get_ids_list())
+        new_rows = np.array([r for r in np.flatnonzero(self.alive) if r not in labels], dtype=np.int64)
+        dead_rows = [r for r in np.flatnonzero(~self.alive) if r in labels]
+        for row in dead_rows:
+            try:
+                index.mark_deleted(int(row))
+            except RuntimeError:
+                pass  # already marked in the saved graph
+        if len(new_rows):
+            index.add_items(np.asarray(self._vectors[new_rows]), new_rows)
+
+    def _build_hnsw(self) -> None:
+        import hnswlib
+
+        rows = np.flatnonzero(self.alive)
+        self.logger.info(f"Building HNSW graph over {len(rows)} vectors")
+        index = hnswlib.Index(space="ip", dim=self.dim)
+        index.init_index(max_elements=max(len(self.ids), 1), M=self.hnsw_m,
+                         ef_construction=self.ef_construction, allow_replace_deleted=False)
+        index.add_items(np.asarray(self._vectors[rows]), rows)
+        index.set_ef(self.ef_search)
+        self._hnsw = index
+
+    def _update_hnsw(self, new_rows: np.ndarray, dead_rows: List[int]) -> None:
+        if self._hnsw is None:
+            if self.count() >= self.hnsw_threshold:
+                self._build_hnsw()
+            return
+        for row in dead_rows:
+            self._hnsw.mark_deleted(int(row))
+        if len(new_rows):
+            if self._hnsw.get_max_elements() < len(self.ids):
+                self._hnsw.resize_index(max(len(self.ids), 2 * self._hnsw.get_max_elements()))
+            self._hnsw.add_items(np.asarray(self._vectors[new_rows]), new_rows)
+
+    # ------------------------------------------------------------------ backend writes
+    def upsert(self, ids, embeddings, texts, metadatas) -> None:
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+        with self._locked(exclusive=True):
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+                with open(self._file("dim.json"), "w") as f:
+                    json.dump({"dim": self.dim}, f)
+
+            dead_rows = [self._rows[chunk_id] for chunk_id in ids if chunk_id in self._rows]
+            first_row = len(self.ids)
+            encoded = [text.encode("utf-8") for text in texts]
+            end = int(self._offsets[-1]) if len(self._offsets) else 0
+            offsets = end + np.cumsum([len(b) for b in encoded], dtype=np.int64)
+
+            with open(self._file("vectors.f32"), "ab") as f:
+                f.write(vectors.tobytes())
+            with open(self._file("texts.bin"), "ab") as f:
+                f.write(b"".join(encoded))
+            with open(self._file("text_offsets.i64"), "ab") as f:
+                f.write(offsets.tobytes())
+            with open(self._file("metadata.jsonl"), "a", encoding="utf-8") as f:
+                f.writelines(json.dumps(m or {}, ensure_ascii=False) + "\n" for m in metadatas)
+            with open(self._file("ids.txt"), "a", encoding="utf-8") as f:
+                f.writelines(chunk_id + "\n" for chunk_id in ids)
+
+            self.ids.extend(ids)
+            self.metadatas.extend(m or {} for m in metadatas)
+            self._offsets = np.concatenate([self._offsets, offsets])
+            self.alive = np.concatenate([self.alive, np.ones(len(ids), dtype=bool)])
+            self.alive[dead_rows] = False
+            for row, chunk_id in enumerate(ids, start=first_row):
+                self._rows[chunk_id] = row
+            self._save_alive()
+
+            self._open_maps()
+            self._update_hnsw(np.arange(first_row, len(self.ids)), dead_rows)
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> None:
+        with self._locked(exclusive=True):
+            dead_rows = [self._rows.pop(chunk_id) for chunk_id in ids or [] if chunk_id in self._rows]
+            if not dead_rows:
+                return
+            self.alive[dead_rows] = False
+            self._save_alive()
+            self._update_hnsw(np.zeros(0, dtype=np.int64), dead_rows)
+
+    def persist(self) -> None:
+        with self._locked(exclusive=True):
+            if self._hnsw is not None:
+                self._hnsw.save_index(self._file("hnsw.bin"))
+
+    # ------------------------------------------------------------------ backend reads
+    def count(self) -> int:
+        with self._locked():
+            return len(self._rows)
+
+    def existing_ids(self, ids: List[str]) -> Set[str]:
+        with self._locked():
+            return {chunk_id for chunk_id in ids if chunk_id in self._rows}
+
+    def all_ids(self) -> List[str]:
+        with self._locked():
+            return list(self._rows)
+
+    def load_embeddings(self) -> Tuple[List[str], np.ndarray]:
+        with self._locked():
+            rows = np.flatnonzero(self.alive)
+            if not len(rows):
+                return [], np.empty((0, self.dim or 0), dtype=np.float32)
+            return [self.ids[r] for r in rows], np.asarray(self._vectors[rows])
+
+    def get_page(self, offset, limit, where=None):
+        with self._locked():
+            rows = self._candidate_rows(where)[offset:offset + limit]
+            return [self.ids[r] for r in rows], [self._text(r) for r in rows], [dict(self.metadatas[r]) for r in rows]
+
+    def iter_records(self, page_size: int = 5000):
+        with self._locked():
+            ids = [self.ids[r] for r in np.flatnonzero(self.alive)]
+        # paged by id, so a reload between pages cannot shift rows under the iterator
+        for i in range(0, len(ids), page_size):
+            with self._locked():
+                page = np.array([self._rows[chunk_id] for chunk_id in ids[i:i + page_size]
+                                 if chunk_id in self._rows], dtype=np.int64)
+                records = ([self.ids[r] for r in page], np.asarray(self._vectors[page]) if len(page)
+                           else np.empty((0, self.dim or 0), dtype=np.float32),
+                           [self._text(r) for r in page], [dict(self.metadatas[r]) for r in page])
+            yield records
+
+    def _document(self, row: int) -> Document:
+        return Document(page_content=self._text(row), metadata={**self.metadatas[row], "chunk_id": self.ids[row]})
+
+    def get_documents_by_id(self, ids: List[str]) -> Dict[str, Document]:
+        with self._locked():
+            return {chunk_id: self._document(self._rows[chunk_id]) for chunk_id in ids if chunk_id in self._rows}
+
+    def _candidate_rows(self, filter: Optional[Dict[str, Any]]) -> np.ndarray:
+        rows = np.flatnonzero(self.alive)
+        if filter:
+            rows = np.array([r for r in rows if matches_filter(self.metadatas[r], filter)], dtype=np.int64)
+        return rows
+
+    def search_by_vector(self, embedding, k, filter=None, include_embeddings=False):
+        query = np.asarray(embedding, dtype=np.float32)
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+
+        with self._locked():
+            if not self._rows:
+                return [], np.empty(0, dtype=np.float32), [], (np.empty((0, self.dim or 0), dtype=np.float32) if include_embeddings else None)
+
+            if self._hnsw is not None:
+                allowed = None
+                if filter:
+                    allowed = set(self._candidate_rows(filter).tolist())
+                k = min(k, len(allowed) if allowed is not None else self.count())
+                if k == 0:
+                    rows, scores = np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+                else:
+                    labels, distances = self._hnsw.knn_query(
+                        query, k=k, filter=(lambda label: label in allowed) if allowed is not None else None
+                    )
+                    rows, scores = labels[0].astype(np.int64), 1.0 - distances[0]
+            else:
+                rows = self._candidate_rows(filter)
+                all_scores = np.asarray(self._vectors[rows]) @ query if len(rows) else np.zeros(0, dtype=np.float32)
+                k = min(k, len(rows))
+                top = np.argpartition(-all_scores, k - 1)[:k] if k else np.zeros(0, dtype=np.int64)
+                top = top[np.argsort(-all_scores[top])]
+                rows, scores = rows[top], all_scores[top]
+
+            ids = [self.ids[r] for r in rows]
+            docs = [self._document(r) for r in rows]
+            embeddings = np.asarray(self._vectors[rows]) if include_embeddings else None
+            return ids, np.asarray(scores, dtype=np.float32), docs, embeddings
+
+    def as_langchain(self):
+        return self
+
+    def get(self, where: Optional[Dict[str, Any]] = None, **kwargs: Any) -> Dict[str, List[Any]]:
+        """Chroma-style ``get`` so callers of ``vector_store.get()`` keep working"""
+        with self._locked():
+            rows = self._candidate_rows(where)
+            return {
+                "ids": [self.ids[r] for r in rows],
+                "documents": [self._text(r) for r in rows],
+                "metadatas": [dict(self.metadatas[r]) for r in rows],
+            }
+
+    # ------------------------------------------------------------------ LangChain VectorStore
+    @property
+    def embeddings(self) -> Optional[Embeddings]:
+        return self.embedding
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None,
+                  ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        self.upsert(ids, np.asarray(self.embedding.embed_documents(texts), dtype=np.float32),
+                    texts, metadatas or [{} for _ in texts])
+        return ids
+
+    def similarity_search_with_score(self, query: str, k: int = 4,
+                                     filter: Optional[Dict[str, Any]] = None,
+                                     **kwargs: Any) -> List[Tuple[Document, float]]:
+        _, scores, docs, _ = self.search_by_vector(self.embedding.embed_query(query), k, filter=filter)
+        return list(zip(docs, scores.tolist()))
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None,
+                          **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter=filter)]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4,
+                                    filter: Optional[Dict[str, Any]] = None, **kwargs: Any) -> List[Document]:
+        return self.search_by_vector(embedding, k, filter=filter)[2]
+
+    def _similarity_search_with_relevance_scores(self, query: str, k: int = 4,
+                                                 **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score(query, k, **kwargs)
+
+    def max_marginal_relevance_search(self, query: str, k: int = 4, fetch_k: int = 20,
+                                      lambda_mult: float = 0.5, filter: Optional[Dict[str, Any]] = None,
+                                      **kwargs: Any) -> List[Document]:
+        return self.max_marginal_relevance_search_by_vector(
+            self.embedding.embed_query(query), k, fetch_k, lambda_mult, filter=filter
+        )
+
+    def max_marginal_relevance_search_by_vector(self, embedding: List[float], k: int = 4, fetch_k: int = 20,
+                                                lambda_mult: float = 0.5,
+                                                filter: Optional[Dict[str, Any]] = None,
+                                                **kwargs: Any) -> List[Document]:
+        _, _, docs, vectors = self.search_by_vector(embedding, fetch_k, filter=filter, include_embeddings=True)
+        if not docs:
+            return []
+        return [docs[i] for i in mmr_select(embedding, vectors, k, lambda_mult)]
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None,
+                   path: str = ".inprocess_store", **kwargs: Any) -> "InProcessVectorStore":
+        store = cls(path, embedding, **kwargs)
+        store.add_texts(texts, metadatas=metadatas)
+        store.persist()
+        return store
+
+
+# one store per directory, shared by every manager over the same collection
+_stores: Dict[str, InProcessVectorStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_in_process_store(path: str, embedding: Embeddings, **kwargs: Any) -> InProcessVectorStore:
+    """The process-wide store over ``path``, opened on first use"""
+    key = os.path.abspath(path)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = InProcessVectorStore(key, embedding, **kwargs)
+        return store
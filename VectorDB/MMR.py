@@ -0,0 +1,42 @@
+from typing import List
+
+import numpy as np
+
+
+def mmr_select(query_vector: np.ndarray, candidates: np.ndarray, k: int,
+               lambda_mult: float = 0.5) -> List[int]:
+    """
+    Maximal marginal relevance over a float32 candidate matrix.
+
+    Rows are picked greedily by ``lambda * sim(query) - (1 - lambda) * max sim(selected)``.
+    Query similarities are one matrix-vector product; each step adds one more
+    product against the newly selected row and keeps a running maximum, so the
+    whole selection costs O(k * fetch_k * dim) in BLAS and never builds the
+    fetch_k x fetch_k similarity matrix.
+
+    Returns the selected row indices in selection order.
+    """
+    candidates = np.asarray(candidates, dtype=np.float32)
+    n = len(candidates)
+    k = min(k, n)
+    if k <= 0:
+        return []
+
+    candidates = candidates / np.maximum(np.linalg.norm(candidates, axis=1, keepdims=True), 1e-12)
+    query = np.asarray(query_vector, dtype=np.float32).ravel()
+    query = query / max(float(np.linalg.norm(query)), 1e-12)
+
+    relevance = lambda_mult * (candidates @ query)
+    redundancy = np.full(n, -np.inf, dtype=np.float32)
+    available = np.ones(n, dtype=bool)
+
+    # First pick is the most relevant row, as in LangChain's maximal_marginal_relevance
+    selected = [int(np.argmax(relevance))]
+    available[selected[0]] = False
+    while len(selected) < k:
+        redundancy = np.maximum(redundancy, candidates @ candidates[selected[-1]])
+        scores = np.where(available, relevance - (1.0 - lambda_mult) * redundancy, -np.inf)
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+    return selected
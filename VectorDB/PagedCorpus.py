@@ -0,0 +1,104 @@
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import json
+import threading
+import weakref
+
+from langchain.schema import Document
+
+from VectorDB.VectorStoreBackend import VectorStoreBackend
+
+
+Page = Tuple[List[str], List[str], List[Dict[str, Any]]]
+
+
+class PagedCorpus:
+    """
+    Lazy, paged view over the texts of one collection.
+
+    Nothing is read until a caller iterates. Pages of ``page_size`` rows are
+    fetched from the backend on demand and the last ``max_pages`` are kept in
+    an LRU, so memory is bounded by the cache rather than by the corpus.
+    """
+
+    def __init__(self, backend: VectorStoreBackend, page_size: int = 1000, max_pages: int = 8):
+        self.backend = backend
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self._pages: "OrderedDict[Tuple[str, int], Page]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return self.backend.count()
+
+    def page(self, number: int, where: Optional[Dict[str, Any]] = None) -> Page:
+        """Ids, texts and metadatas of page ``number`` of the rows matching ``where``"""
+        key = (json.dumps(where, sort_keys=True) if where else "", number)
+        with self._lock:
+            if key in self._pages:
+                self._pages.move_to_end(key)
+                self.hits += 1
+                return self._pages[key]
+
+        page = self.backend.get_page(number * self.page_size, self.page_size, where=where)
+        with self._lock:
+            self.misses += 1
+            self._pages[key] = page
+            while len(self._pages) > self.max_pages:
+                self._pages.popitem(last=False)
+        return page
+
+    def iter_pages(self, where: Optional[Dict[str, Any]] = None) -> Iterator[Page]:
+        number = 0
+        while True:
+            page = self.page(number, where)
+            if not page[0]:
+                return
+            yield page
+            if len(page[0]) < self.page_size:
+                return
+            number += 1
+
+    def iter_documents(self, where: Optional[Dict[str, Any]] = None) -> Iterator[Document]:
+        """Stream the (matching) chunks as Documents, one page in memory at a time"""
+        for ids, texts, metadatas in self.iter_pages(where):
+            for chunk_id, text, metadata in zip(ids, texts, metadatas):
+                yield Document(page_content=text, metadata={**metadata, "chunk_id": chunk_id})
+
+    def invalidate(self) -> None:
+        """Drop cached pages, e.g. after the collection was written to"""
+        with self._lock:
+            self._pages.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "cached_pages": len(self._pages),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
+
+
+# one corpus view per collection, shared by every manager over it while any holds it
+_corpora: "weakref.WeakValueDictionary[Tuple[str, ...], PagedCorpus]" = weakref.WeakValueDictionary()
+_corpora_lock = threading.Lock()
+
+
+def get_paged_corpus(key: Tuple[str, ...], backend: VectorStoreBackend, **kwargs) -> PagedCorpus:
+    """Shared PagedCorpus for the collection identified by ``key``"""
+    with _corpora_lock:
+        corpus = _corpora.get(key)
+        if corpus is None:
+            corpus = PagedCorpus(backend, **kwargs)
+            _corpora[key] = corpus
+        return corpus
+
+
+def invalidate_paged_corpus(key: Tuple[str, ...]) -> None:
+    """Drop cached pages of the shared corpus for ``key``, if one is alive"""
+    corpus = _corpora.get(key)
+    if corpus is not None:
+        corpus.invalidate()
@@ -0,0 +1,312 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import json
+import os
+import threading
+
+import numpy as np
+
+from Enums import VectorQuantization
+
+
+# number of set bits in every byte value, for Hamming distances on packed codes
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+class QuantizedIndex:
+    """
+    Compact first-pass index over a collection's embeddings.
+
+    Vectors are kept as int8 scalar codes (one byte per dimension) or binary
+    codes (one bit per dimension) in memory. A search scores every code, keeps
+    ``k * rescore_factor`` candidates and rescores only those with the exact
+    float32 vectors, which stay on disk in a memory-mapped file.
+
+    Files under ``path``:
+      - ``ids.json``: chunk ids in row order
+      - ``codes.npy``: int8 codes (N x dim) or packed bits (N x dim/8)
+      - ``params.npz``: per-dimension int8 calibration (min and step)
+      - ``vectors.f32``: normalized float32 vectors, row-major
+
+    Codes live in a preallocated buffer that grows by doubling and ids are
+    appended to their list, so ``add`` costs only the added rows. Searches
+    take ``(ids, size, codes, vectors)`` under the lock and read only the
+    first ``size`` rows, which appends never move; a growth, ``remove`` or
+    ``build`` swaps in new objects instead, and a rewritten vector file
+    replaces the old one, so searches need not hold the lock.
+
+    ``add`` writes vectors through but keeps ids and codes in memory until
+    ``persist`` (ChromaDBManager calls it at its store checkpoints).
+    """
+
+    # rows scored per block by the first pass
+    block_rows = 4096
+
+    def __init__(self, path: str, mode: VectorQuantization = VectorQuantization.INT8,
+                 rescore_factor: int = 4):
+        self.path = path
+        self.mode = mode
+        self.rescore_factor = rescore_factor
+        os.makedirs(path, exist_ok=True)
+
+        self.ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._codes: Optional[np.ndarray] = None  # capacity >= len(ids) rows
+        self._dirty = False
+        self.dim: Optional[int] = None
+        self._min: Optional[np.ndarray] = None
+        self._step: Optional[np.ndarray] = None
+        self._vectors: Optional[np.memmap] = None
+        self._lock = threading.Lock()
+
+        self._load()
+
+    # ------------------------------------------------------------------ files
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _load(self) -> None:
+        if not os.path.exists(self._file("ids.json")):
+            return
+        with open(self._file("ids.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("mode") != self.mode.value:
+            # Built with another quantization mode: treat as empty so it gets rebuilt
+            return
+
+        self.ids = meta["ids"]
+        self.dim = meta["dim"]
+        self._rows = {chunk_id: row for row, chunk_id in enumerate(self.ids)}
+        self._codes = np.load(self._file("codes.npy"))
+        params = np.load(self._file("params.npz"))
+        self._min, self._step = params["min"], params["step"]
+        self._open_vectors()
+
+    @property
+    def codes(self) -> Optional[np.ndarray]:
+        """Codes of the stored rows (a view of the buffer)"""
+        return self._codes[:len(self.ids)] if self._codes is not None else None
+
+    def _save(self) -> None:
+        np.save(self._file("codes.npy"), self.codes)
+        np.savez(self._file("params.npz"), min=self._min, step=self._step)
+        with open(self._file("ids.json"), "w", encoding="utf-8") as f:
+            json.dump({"mode": self.mode.value, "dim": self.dim, "ids": self.ids}, f)
+        self._dirty = False
+
+    def persist(self) -> None:
+        """Write ids and codes changed by ``add`` since the last save"""
+        with self._lock:
+            if self._dirty and self.ids:
+                self._save()
+
+    def _open_vectors(self) -> None:
+        self._vectors = np.memmap(self._file("vectors.f32"), dtype=np.float32, mode="r+",
+                                  shape=(len(self.ids), self.dim)) if self.ids else None
+
+    def _write_vectors(self, vectors: np.ndarray) -> None:
+        # a new file, not rewritten in place: maps held by running searches stay valid
+        tmp = self._file("vectors.f32.tmp")
+        vectors.tofile(tmp)
+        os.replace(tmp, self._file("vectors.f32"))
+
+    def _publish(self, ids: List[str], codes: Optional[np.ndarray]) -> None:
+        """Swap in a rebuilt state and save it (caller holds the lock)"""
+        self.ids, self._codes = ids, codes
+        self._rows = {chunk_id: row for row, chunk_id in enumerate(ids)}
+        if ids:
+            self._save()
+        self._open_vectors()
+
+    def _reserve(self, rows: int) -> None:
+        """Make room for ``rows`` codes, doubling the buffer (caller holds the lock)"""
+        if rows <= len(self._codes):
+            return
+        grown = np.empty((max(rows, 2 * len(self._codes)),) + self._codes.shape[1:], dtype=self._codes.dtype)
+        grown[:len(self.ids)] = self._codes[:len(self.ids)]
+        # a new buffer: searches holding the old one keep a valid snapshot
+        self._codes = grown
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    # ------------------------------------------------------------------ encoding
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        matrix = np.asarray(matrix, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-12)
+
+    def _calibrate(self, vectors: np.ndarray) -> None:
+        """Per-dimension range used by int8 codes"""
+        low, high = vectors.min(axis=0), vectors.max(axis=0)
+        self._min = low.astype(np.float32)
+        self._step = np.maximum((high - low) / 255.0, 1e-8).astype(np.float32)
+
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        if self.mode == VectorQuantization.BINARY:
+            return np.packbits(vectors > 0, axis=1)
+        codes = np.rint((vectors - self._min) / self._step) - 128
+        return np.clip(codes, -128, 127).astype(np.int8)
+
+    def _first_pass(self, codes: np.ndarray, step: Optional[np.ndarray], query: np.ndarray, n: int) -> np.ndarray:
+        """
+        Approximate scores for every row; returns the rows of the best ``n``.
+        Codes are scored in blocks of ``block_rows``, so the temporaries of a
+        query stay a few MB instead of a float copy of every code.
+        """
+        scores = np.empty(len(codes), dtype=np.float32)
+        if self.mode == VectorQuantization.BINARY:
+            query_bits = np.packbits(query > 0)
+            for start in range(0, len(codes), self.block_rows):
+                block = codes[start:start + self.block_rows]
+                # Hamming distance, negated so higher is better
+                distances = _POPCOUNT[np.bitwise_xor(block, query_bits)].sum(axis=1, dtype=np.int32)
+                scores[start:start + len(block)] = -distances
+        else:
+            # q . dequant(code) = q . min + (code + 128) . (q * step); the terms
+            # that do not depend on the code are the same for every row, so
+            # ranking by code . (q * step) is enough
+            weights = query * step
+            for start in range(0, len(codes), self.block_rows):
+                block = codes[start:start + self.block_rows]
+                scores[start:start + len(block)] = block.astype(np.float32) @ weights
+
+        n = min(n, len(scores))
+        top = np.argpartition(-scores, n - 1)[:n]
+        return top[np.argsort(-scores[top])]
+
+    # ------------------------------------------------------------------ writes
+    def build(self, ids: Sequence[str], embeddings: np.ndarray) -> None:
+        """(Re)create the index from scratch"""
+        vectors = self._normalize(embeddings)
+        with self._lock:
+            self._build(list(ids), vectors)
+
+    def _build(self, ids: List[str], vectors: np.ndarray) -> None:
+        self.dim = vectors.shape[1] if len(vectors) else None
+        if not ids:
+            self._publish([], None)
+            return
+        self._calibrate(vectors)
+        codes = self._encode(vectors)
+        self._write_vectors(vectors)
+        self._publish(ids, codes)
+
+    def add(self, ids: Sequence[str], embeddings: np.ndarray) -> None:
+        """
+        Insert or overwrite rows in place; new rows are appended to the vector
+        file, the code buffer and the id list. Ids and codes reach disk on ``persist``.
+        """
+        vectors = self._normalize(embeddings)
+        with self._lock:
+            if not self.ids:
+                self._build(list(ids), vectors)
+                return
+
+            codes = self._encode(vectors)
+            new_rows: Dict[str, int] = {}
+            for i, chunk_id in enumerate(ids):
+                row = self._rows.get(chunk_id)
+                if row is None:
+                    new_rows[chunk_id] = i  # a repeated new id keeps its last vector
+                else:
+                    # same id, same row: searches see either the old or the new vector
+                    self._vectors[row] = vectors[i]
+                    self._codes[row] = codes[i]
+            self._vectors.flush()
+
+            if new_rows:
+                picked = list(new_rows.values())
+                size = len(self.ids)
+                # written right after the published rows (past any tail a crash left
+                # behind); the mapped prefix stays untouched
+                with open(self._file("vectors.f32"), "r+b") as f:
+                    f.seek(size * self.dim * 4)
+                    f.write(vectors[picked].tobytes())
+                self._reserve(size + len(picked))
+                self._codes[size:size + len(picked)] = codes[picked]
+                for row, chunk_id in enumerate(new_rows, start=size):
+                    self._rows[chunk_id] = row
+                # appended last: a search that sees the new length also sees their codes
+                self.ids.extend(new_rows)
+                self._open_vectors()
+            self._dirty = True
+
+    def remove(self, ids: Sequence[str]) -> None:
+        """Drop rows by id, compacting codes and the vector file"""
+        with self._lock:
+            drop = {self._rows[chunk_id] for chunk_id in ids if chunk_id in self._rows}
+            if not drop:
+                return
+            keep = np.array([row for row in range(len(self.ids)) if row not in drop], dtype=np.int64)
+            self._write_vectors(np.asarray(self._vectors[keep]))
+            self._publish([self.ids[row] for row in keep], self.codes[keep])
+
+    # ------------------------------------------------------------------ search
+    def search_with_vectors(self, query: np.ndarray, n: int,
+                            candidates: Optional[int] = None) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """
+        Top ``n`` rows after exact rescoring of the first-pass candidates.
+        Returns ids, cosine scores and the float32 vectors of those rows.
+        """
+        with self._lock:
+            ids, size, codes, step, stored = self.ids, len(self.ids), self._codes, self._step, self._vectors
+        if not size:
+            return [], np.empty(0, dtype=np.float32), np.empty((0, self.dim or 0), dtype=np.float32)
+
+        query = self._normalize(query)
+        # rows past ``size`` may be appended after the snapshot; they are not scored
+        rows = self._first_pass(codes[:size], step, query, candidates or n * self.rescore_factor)
+
+        # Exact rescoring reads only the candidate rows from disk
+        order = np.sort(rows)
+        vectors = np.asarray(stored[order])
+        scores = vectors @ query
+        best = np.argsort(-scores)[:n]
+        return [ids[r] for r in order[best]], scores[best], vectors[best]
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[List[str], np.ndarray]:
+        ids, scores, _ = self.search_with_vectors(query, k)
+        return ids, scores
+
+    # ------------------------------------------------------------------ reports
+    def memory_report(self) -> Dict[str, Any]:
+        """In-memory code size versus the float32 vectors kept on disk"""
+        code_bytes = int(self.codes.nbytes) if self._codes is not None else 0
+        float_bytes = len(self.ids) * (self.dim or 0) * 4
+        return {
+            "mode": self.mode.value,
+            "vectors": len(self.ids),
+            "dim": self.dim,
+            "code_bytes": code_bytes,
+            "float_bytes_on_disk": float_bytes,
+            "compression": float_bytes / code_bytes if code_bytes else 0.0,
+        }
+
+    def sample_vectors(self, n: int, seed: int = 42) -> np.ndarray:
+        """Random stored vectors, e.g. to use as probe queries"""
+        rows = np.random.default_rng(seed).choice(len(self.ids), size=min(n, len(self.ids)), replace=False)
+        return np.asarray(self._vectors[np.sort(rows)])
+
+    def recall_report(self, queries: np.ndarray, k: int = 5,
+                      rescore_factors: Sequence[int] = (1, 2, 4, 8)) -> Dict[str, Any]:
+        """
+        Recall@k of quantized search + rescoring against exact float search,
+        for several candidate pool sizes, next to the memory footprint.
+        """
+        queries = self._normalize(np.atleast_2d(queries))
+        exact_scores = queries @ np.asarray(self._vectors).T
+        exact = [set(np.argsort(-row)[:k]) for row in exact_scores]
+
+        recall = {}
+        for factor in rescore_factors:
+            hits = 0
+            for query, truth in zip(queries, exact):
+                ids, _, _ = self.search_with_vectors(query, k, candidates=k * factor)
+                hits += len(truth & {self._rows[i] for i in ids})
+            recall[factor] = hits / (k * len(queries)) if len(queries) else 0.0
+
+        report = self.memory_report()
+        report["k"] = k
+        report["recall_by_rescore_factor"] = recall
+        return report
@@ -0,0 +1,237 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+import weakref
+
+import numpy as np
+from langchain.schema import Document
+from langchain_community.vectorstores import Chroma
+
+from VectorDB.ChromaClientPool import chroma_client_pool
+
+
+class VectorStoreBackend(ABC):
+    """
+    Storage interface used by ChromaDBManager.
+
+    Scores returned by searches are similarities (higher is better) so that
+    results from different backends can be compared and fused. Documents
+    returned by searches and lookups carry their store id as ``chunk_id``
+    in their metadata.
+    """
+
+    @abstractmethod
+    def upsert(self, ids: List[str], embeddings: np.ndarray, texts: List[str],
+               metadatas: List[Dict[str, Any]]) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, ids: List[str]) -> None:
+        ...
+
+    @abstractmethod
+    def count(self) -> int:
+        ...
+
+    @abstractmethod
+    def existing_ids(self, ids: List[str]) -> Set[str]:
+        """Subset of ``ids`` already stored"""
+
+    @abstractmethod
+    def all_ids(self) -> List[str]:
+        ...
+
+    @abstractmethod
+    def load_embeddings(self) -> Tuple[List[str], np.ndarray]:
+        """Every stored id with its embedding as one float32 matrix"""
+
+    @abstractmethod
+    def get_documents_by_id(self, ids: List[str]) -> Dict[str, Document]:
+        """Documents of the stored ``ids``, keyed by id in request order (missing ids are absent)"""
+
+    def get_documents(self, ids: List[str]) -> List[Document]:
+        """Documents for ``ids``, in the same order (missing ids are skipped)"""
+        return list(self.get_documents_by_id(ids).values())
+
+    @abstractmethod
+    def get_page(self, offset: int, limit: int, where: Optional[Dict[str, Any]] = None
+                 ) -> Tuple[List[str], List[str], List[Dict[str, Any]]]:
+        """Ids, texts and metadatas of one page of (matching) rows, without embeddings"""
+
+    @abstractmethod
+    def iter_records(self, page_size: int = 5000
+                     ) -> Iterator[Tuple[List[str], np.ndarray, List[str], List[Dict[str, Any]]]]:
+        """Every stored row as pages of (ids, embeddings, texts, metadatas)"""
+
+    @abstractmethod
+    def search_by_vector(self, embedding: np.ndarray, k: int,
+                         filter: Optional[Dict[str, Any]] = None,
+                         include_embeddings: bool = False
+                         ) -> Tuple[List[str], np.ndarray, List[Document], Optional[np.ndarray]]:
+        """Top-k ids, similarity scores, documents and (optionally) their embeddings"""
+
+    def persist(self) -> None:
+        """Flush pending state to disk (no-op for stores that write through)"""
+
+    def close(self) -> None:
+        """Release shared resources (no-op for stores that own nothing shared)"""
+
+    @abstractmethod
+    def as_langchain(self):
+        """LangChain VectorStore view used by retrievers (as_retriever, get, ...)"""
+
+
+class ChromaBackend(VectorStoreBackend):
+    """
+    Backend over LangChain's Chroma store. The underlying persistent client
+    comes from the process-wide pool, so every backend on the same directory
+    shares one client; it is released on ``close`` or garbage collection.
+    """
+
+    def __init__(self, collection_name: str, persist_directory: str, embedding_function):
+        client = chroma_client_pool.acquire(persist_directory)
+        self._release = weakref.finalize(self, chroma_client_pool.release, persist_directory)
+        self.store = Chroma(
+            collection_name=collection_name,
+            client=client,
+            persist_directory=persist_directory,
+            embedding_function=embedding_function
+        )
+
+    @property
+    def collection(self):
+        return self.store._collection
+
+    def upsert(self, ids, embeddings, texts, metadatas) -> None:
+        self.collection.upsert(ids=ids, embeddings=embeddings, documents=texts, metadatas=metadatas)
+
+    def delete(self, ids: List[str]) -> None:
+        self.collection.delete(ids=ids)
+
+    def count(self) -> int:
+        return self.collection.count()
+
+    def existing_ids(self, ids: List[str], page_size: int = 5000) -> Set[str]:
+        existing = set()
+        for i in range(0, len(ids), page_size):
+            existing.update(self.collection.get(ids=ids[i:i + page_size], include=[])["ids"])
+        return existing
+
+    def all_ids(self, page_size: int = 5000) -> List[str]:
+        ids, offset = [], 0
+        while True:
+            page = self.collection.get(include=[], limit=page_size, offset=offset)["ids"]
+            if not page:
+                return ids
+            ids.extend(page)
+            offset += len(page)
+
+    def load_embeddings(self, page_size: int = 5000) -> Tuple[List[str], np.ndarray]:
+        ids, chunks = [], []
+        offset = 0
+        while True:
+            page = self.collection.get(include=["embeddings"], limit=page_size, offset=offset)
+            if not page["ids"]:
+                break
+            ids.extend(page["ids"])
+            chunks.append(np.asarray(page["embeddings"], dtype=np.float32))
+            offset += len(page["ids"])
+        matrix = np.concatenate(chunks) if chunks else np.empty((0, 0), dtype=np.float32)
+        return ids, matrix
+
+    def get_page(self, offset, limit, where=None):
+        page = self.collection.get(include=["documents", "metadatas"], where=where,
+                                   limit=limit, offset=offset)
+        return page["ids"], page["documents"], [m or {} for m in page["metadatas"]]
+
+    def iter_records(self, page_size: int = 5000):
+        offset = 0
+        while True:
+            page = self.collection.get(include=["embeddings", "documents", "metadatas"],
+                                       limit=page_size, offset=offset)
+            if not page["ids"]:
+                return
+            yield (page["ids"], np.asarray(page["embeddings"], dtype=np.float32),
+                   page["documents"], [m or {} for m in page["metadatas"]])
+            offset += len(page["ids"])
+
+    def get_documents_by_id(self, ids: List[str]) -> Dict[str, Document]:
+        if not ids:
+            return {}
+        found = self.collection.get(ids=ids, include=["documents", "metadatas"])
+        by_id = {
+            chunk_id: Document(page_content=text, metadata={**(metadata or {}), "chunk_id": chunk_id})
+            for chunk_id, text, metadata in zip(found["ids"], found["documents"], found["metadatas"])
+        }
+        return {chunk_id: by_id[chunk_id] for chunk_id in ids if chunk_id in by_id}
+
+    def _similarity(self, distances: np.ndarray) -> np.ndarray:
+        """Chroma distances -> similarities (exact cosine for normalized vectors)"""
+        space = (self.collection.metadata or {}).get("hnsw:space", "l2")
+        if space == "l2":
+            return 1.0 - distances / 2.0
+        return 1.0 - distances
+
+    def search_by_vector(self, embedding, k, filter=None, include_embeddings=False):
+        include = ["documents", "metadatas", "distances"] + (["embeddings"] if include_embeddings else [])
+        result = self.collection.query(
+            query_embeddings=[np.asarray(embedding, dtype=np.float32)],
+            n_results=k,
+            where=filter,
+            include=include,
+        )
+        ids = result["ids"][0]
+        docs = [
+            Document(page_content=text, metadata={**(metadata or {}), "chunk_id": chunk_id})
+            for chunk_id, text, metadata in zip(ids, result["documents"][0], result["metadatas"][0])
+        ]
+        scores = self._similarity(np.asarray(result["distances"][0], dtype=np.float32))
+        embeddings = np.asarray(result["embeddings"][0], dtype=np.float32) if include_embeddings else None
+        return ids, scores, docs, embeddings
+
+    def persist(self) -> None:
+        self.store.persist()
+
+    def close(self) -> None:
+        self._release()
+
+    def as_langchain(self):
+        return self.store
+
+
+_RANGE_OPERATORS = {
+    "$eq": lambda a, b: a == b,
+    "$ne": lambda a, b: a != b,
+    "$gt": lambda a, b: a is not None and a > b,
+    "$gte": lambda a, b: a is not None and a >= b,
+    "$lt": lambda a, b: a is not None and a < b,
+    "$lte": lambda a, b: a is not None and a <= b,
+    "$in": lambda a, b: a in b,
+    "$nin": lambda a, b: a not in b,
+}
+
+
+def matches_filter(metadata: Dict[str, Any], where: Optional[Dict[str, Any]]) -> bool:
+    """Evaluate a Chroma-style ``where`` clause against one metadata dict"""
+    if not where:
+        return True
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(matches_filter(metadata, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_filter(metadata, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            for operator, operand in condition.items():
+                compare = _RANGE_OPERATORS.get(operator)
+                if compare is None:
+                    raise ValueError(f"Unsupported filter operator: {operator}")
+                try:
+                    if not compare(value, operand):
+                        return False
+                except TypeError:
+                    return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
@@ -1,6 +1,7 @@
 # config.py
+from typing import List, Optional, Tuple
 from pydantic_settings import BaseSettings   # ← updated import
-from Enums import ProviderName, RetrievalMethod, QueryType
+from Enums import ProviderName, RetrievalMethod, QueryType, EmbeddingBackend, VectorQuantization, VectorBackend, LexicalAnalyzer, FusionMethod, CompressionMode
 
 class Settings(BaseSettings):
     # external APIs
@@ -17,12 +18,65 @@ class Settings(BaseSettings):
     PROVIDER_NAME: ProviderName
     LLM_MODEL_NAME: str
     EMBEDDING_MODEL_NAME: str
+    EMBEDDING_MODEL_REVISION: Optional[str] = None
+    EMBEDDING_BACKEND: EmbeddingBackend = EmbeddingBackend.TORCH
+    EMBEDDING_ONNX_DIR: str = ".onnx_models"
+    EMBEDDING_QUANTIZATION_CONFIG: str = "avx2"  # avx2 | avx512 | avx512_vnni | arm64
+
+    # embedding cache
+    EMBEDDING_CACHE_DIR: str = ".embedding_cache"
+    EMBEDDING_CACHE_MAX_BYTES: Optional[int] = 2 * 1024 ** 3
+    EMBEDDING_MEMORY_CACHE_BYTES: int = 64 * 1024 ** 2
+
+    # length-bucketed batching: max padded tokens per batch (None = fixed batch size)
+    EMBEDDING_TOKEN_BUDGET: Optional[int] = 8192
+
+    # multi-process encoding for large ingests (0/1 = disabled)
+    EMBEDDING_NUM_WORKERS: int = 0
+    EMBEDDING_MULTIPROCESS_THRESHOLD: int = 2048
+
+    # micro-batching of concurrent query embeddings, e.g. 5.0 (None = disabled)
+    EMBEDDING_MICRO_BATCH_WINDOW_MS: Optional[float] = None
+    EMBEDDING_MICRO_BATCH_MAX: int = 32
 
     # retrieval defaults
     RETRIEVE_METHOD: RetrievalMethod = RetrievalMethod.SIMILARITY_SEARCH
     K: int = 5
     FETCH_K: int = 7
 
+    # federated retrieval: extra (db_path, collection) pairs, JSON in the env
+    # (empty = the uploads collection at NEW_DB_PATH)
+    FEDERATED_SOURCES: List[Tuple[str, str]] = []
+    FEDERATED_TIMEOUT_S: float = 2.0
+
+    # vector store backend: chroma | in_process (NumPy exact / HNSW)
+    VECTOR_BACKEND: VectorBackend = VectorBackend.CHROMA
+
+    # analyzer of the BM25 index used by hybrid retrieval: arabic | simple
+    LEXICAL_ANALYZER: LexicalAnalyzer = LexicalAnalyzer.ARABIC
+
+    # hybrid retrieval: fusion (rrf | normalized_score), (dense, lexical) weights
+    # and candidates per leg (null = k)
+    HYBRID_FUSION: FusionMethod = FusionMethod.RECIPROCAL_RANK
+    HYBRID_WEIGHTS: Tuple[float, float] = (0.5, 0.5)
+    HYBRID_K: Tuple[Optional[int], Optional[int]] = (None, None)
+
+    # cross-encoder reranking of rerank_fetch_k candidates down to K (off by default)
+    RERANK_ENABLED: bool = False
+    RERANKER_MODEL_NAME: str = "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1"
+    RERANK_FETCH_K: int = 20
+
+    # contextual retrieval: llm (concurrent extractor calls) | extractive (no LLM)
+    CONTEXTUAL_COMPRESSION: CompressionMode = CompressionMode.LLM
+    CONTEXTUAL_MAX_CONCURRENCY: int = 4
+    CONTEXTUAL_DEADLINE_S: float = 15.0
+
+    # bounded cache of retrieval results, invalidated on every write to the collection (0 = off)
+    RETRIEVAL_CACHE_SIZE: int = 2048
+
+    # quantized first-pass vector index (None = plain Chroma search)
+    VECTOR_QUANTIZATION: Optional[VectorQuantization] = None
+
     class Config:
         env_file = ".env"
         case_sensitive = False
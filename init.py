@@ -13,13 +13,15 @@ from RAGPipeline.RAGPipelineManager import RAGPipelineManager
 from QueryClassification.QueryDocumentProcessor import QueryDocumentProcessor
 from WebSearch.Search import Search
 from QuizGeneration.QuizGeneration import QuizGeneration
-from Embedding.EmbeddingProvider import EmbeddingProvider
+from Embedding.EmbeddingProvider import get_embedding_provider
+from Embedding.ModelRegistry import model_registry
 from LLMProvider.LLMProvider import LLMProvider
 from PromptManager.PromptManager import PromptManager
 from QueryTransformer.QueryTransformer import QueryTransformer
 from HallucinationsCheck.HallucinationsCheck import HallucinationsCheck
 from YoutubeSearch.YoutubeSearch import YoutubeSearch
 from MindMap.MindMap import MindMap
+from Reranker.Reranker import Reranker
 
 _llm_provider = LLMProvider(
     api_key=settings.TOGETHER_API_KEY,
@@ -31,12 +33,29 @@ _llm_provider = LLMProvider(
 
 _prompt_manager = PromptManager()
 
-# shared EmbeddingProvider (if you need it elsewhere)
-_embedding_provider = EmbeddingProvider(
+model_registry.onnx_dir = settings.EMBEDDING_ONNX_DIR
+model_registry.quantization_config = settings.EMBEDDING_QUANTIZATION_CONFIG
+
+# shared EmbeddingProvider: registered first so every ChromaDBManager, the
+# Summarizer and the evaluation handler reuse it (the model loads on first use)
+_embedding_provider = get_embedding_provider(
     model_name=settings.EMBEDDING_MODEL_NAME,
+    backend=settings.EMBEDDING_BACKEND,
+    cache_dir=settings.EMBEDDING_CACHE_DIR,
     batch_size=16,
+    revision=settings.EMBEDDING_MODEL_REVISION,
+    max_cache_bytes=settings.EMBEDDING_CACHE_MAX_BYTES,
+    memory_cache_bytes=settings.EMBEDDING_MEMORY_CACHE_BYTES,
+    token_budget=settings.EMBEDDING_TOKEN_BUDGET,
+    num_workers=settings.EMBEDDING_NUM_WORKERS,
+    multiprocess_threshold=settings.EMBEDDING_MULTIPROCESS_THRESHOLD,
+    micro_batch_window_ms=settings.EMBEDDING_MICRO_BATCH_WINDOW_MS,
+    micro_batch_max=settings.EMBEDDING_MICRO_BATCH_MAX,
 )
 
+# shared cross-encoder (loaded on first rerank), None when reranking is disabled
+_reranker = Reranker(model_name=settings.RERANKER_MODEL_NAME) if settings.RERANK_ENABLED else None
+
 
 def initialize_rag_manager(
     db_path: str = settings.DB_PATH,
@@ -72,6 +91,20 @@ def initialize_rag_manager(
         k=settings.K,
         fetch_k=settings.FETCH_K,
         retrieve_method=settings.RETRIEVE_METHOD,
+        quantization=settings.VECTOR_QUANTIZATION,
+        vector_backend=settings.VECTOR_BACKEND,
+        lexical_analyzer=settings.LEXICAL_ANALYZER,
+        hybrid_fusion=settings.HYBRID_FUSION,
+        hybrid_weights=settings.HYBRID_WEIGHTS,
+        hybrid_k=settings.HYBRID_K,
+        reranker=_reranker,
+        rerank_fetch_k=settings.RERANK_FETCH_K,
+        compression_mode=settings.CONTEXTUAL_COMPRESSION,
+        compression_concurrency=settings.CONTEXTUAL_MAX_CONCURRENCY,
+        compression_deadline=settings.CONTEXTUAL_DEADLINE_S,
+        federated_sources=settings.FEDERATED_SOURCES or [(settings.NEW_DB_PATH, "new_data")],
+        federated_timeout=settings.FEDERATED_TIMEOUT_S,
+        retrieval_cache_size=settings.RETRIEVAL_CACHE_SIZE,
     )
 
 
@@ -143,4 +176,11 @@ def initialize_summarizer(
         embedding_provider=_embedding_provider,
         prompt_manager=_prompt_manager,
         max_chunk_limit=max_chunk_limit,
-    )
\ No newline at end of file
+    )
+
+
+def embedding_memory_report() -> dict:
+    """
+    Memory held by each loaded embedding model.
+    """
+    return model_registry.memory_report()